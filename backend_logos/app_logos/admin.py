@@ -1,5 +1,57 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from .autenticacion import invalidar_usuarios
 from .models import Autor, Categoria, Libro, PerfilUsuario, Orden, DetalleOrden, Carrito
+from .paginacion import ConteoEstimadoPaginator
+
+# Filtros de texto para el panel lateral. Un filtro por relación lista todas las filas
+# relacionadas (todos los usuarios, todos los autores), lo que no escala con miles de registros.
+
+class FiltroTexto(admin.SimpleListFilter):
+    template = 'admin/filtro_texto.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        # Sin opciones fijas Django ocultaría el filtro; el campo de texto siempre se muestra
+        return True
+
+    def choices(self, changelist):
+        # Conserva el resto de los filtros, la búsqueda y el orden al enviar el formulario
+        yield {
+            'value': self.value() or '',
+            'parametros': [
+                (clave, valor) for clave, valor in changelist.params.items()
+                if clave not in (self.parameter_name, 'p')
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value().strip()})
+        return queryset
+
+class UsuarioFiltro(FiltroTexto):
+    title = 'usuario'
+    parameter_name = 'usuario'
+    lookup = 'usuario__username'
+
+class AutorFiltro(FiltroTexto):
+    title = 'apellido del autor'
+    parameter_name = 'autor_apellido'
+    lookup = 'autor__apellido__istartswith'
+
+class ConteoEstimadoMixin:
+    # Listados de tablas grandes: el paginador necesita la página pedida para saber hasta dónde contar
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, pagina=request.GET.get(PAGE_VAR, 1))
 
 # Personalización para el panel de administración
 
@@ -11,14 +63,16 @@ class AutorAdmin(admin.ModelAdmin):
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'slug', 'categoria_padre', 'activa')
+    list_select_related = ('categoria_padre',)
     prepopulated_fields = {'slug': ('nombre',)}
     list_filter = ('activa', 'categoria_padre')
     search_fields = ('nombre', 'slug') # <-- Added this line
 
 @admin.register(Libro)
-class LibroAdmin(admin.ModelAdmin):
+class LibroAdmin(ConteoEstimadoMixin, admin.ModelAdmin):
     list_display = ('titulo', 'autor', 'categoria', 'precio', 'stock', 'activo', 'destacado')
-    list_filter = ('activo', 'destacado', 'categoria', 'autor')
+    list_select_related = ('autor', 'categoria')
+    list_filter = ('activo', 'destacado', 'categoria', AutorFiltro)
     search_fields = ('titulo', 'autor__nombre', 'autor__apellido')
     autocomplete_fields = ('autor', 'categoria') # Mejora la selección de autor y categoría
 
@@ -29,19 +83,52 @@ class DetalleOrdenInline(admin.TabularInline):
     readonly_fields = ('subtotal',)
 
 @admin.register(Orden)
-class OrdenAdmin(admin.ModelAdmin):
+class OrdenAdmin(ConteoEstimadoMixin, admin.ModelAdmin):
     list_display = ('id', 'cliente', 'fecha_orden', 'total', 'estado')
+    list_select_related = ('cliente',)
     list_filter = ('estado', 'fecha_orden')
-    search_fields = ('cliente__username', 'id')
+    search_fields = ('^cliente__username',)
+    search_help_text = "Número de pedido exacto o inicio del nombre de usuario."
     inlines = [DetalleOrdenInline]
     readonly_fields = ('fecha_orden', 'total', 'subtotal', 'costo_envio')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Un número (con o sin '#') se busca como id exacto, usando la llave primaria
+        termino = search_term.strip().lstrip('#')
+        if termino.isdigit():
+            return queryset.filter(id=int(termino)), False
+        return super().get_search_results(request, queryset, search_term)
+
+admin.site.unregister(User)
+
+@admin.register(User)
+class UsuarioAdmin(UserAdmin):
+    actions = ['activar', 'desactivar']
+
+    def _cambiar_activo(self, request, queryset, activo):
+        ids = list(queryset.values_list('id', flat=True))
+        cambiados = User.objects.filter(id__in=ids).update(is_active=activo)
+        # update() no envía post_save: sin esto seguirían en la caché de UsuarioEnCacheBackend
+        invalidar_usuarios(ids)
+        self.message_user(request, f"{cambiados} usuarios actualizados.")
+
+    @admin.action(description="Activar usuarios seleccionados", permissions=['change'])
+    def activar(self, request, queryset):
+        self._cambiar_activo(request, queryset, True)
+
+    @admin.action(description="Desactivar usuarios seleccionados", permissions=['change'])
+    def desactivar(self, request, queryset):
+        self._cambiar_activo(request, queryset, False)
+
 @admin.register(PerfilUsuario)
-class PerfilUsuarioAdmin(admin.ModelAdmin):
+class PerfilUsuarioAdmin(ConteoEstimadoMixin, admin.ModelAdmin):
     list_display = ('usuario', 'telefono', 'ciudad', 'es_administrador')
+    list_select_related = ('usuario',)
     search_fields = ('usuario__username',)
 
 @admin.register(Carrito)
-class CarritoAdmin(admin.ModelAdmin):
+class CarritoAdmin(ConteoEstimadoMixin, admin.ModelAdmin):
     list_display = ('usuario', 'libro', 'cantidad', 'fecha_agregado')
-    list_filter = ('usuario', 'fecha_agregado')
+    list_select_related = ('usuario', 'libro')
+    list_filter = (UsuarioFiltro, 'fecha_agregado')
+    search_fields = ('^usuario__username', 'libro__titulo')
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AppLogosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_logos'
+
+    def ready(self):
+        # Registra las señales que invalidan la caché del catálogo y del carrito, generan
+        # miniaturas, cuentan las consultas de cada petición para Server-Timing y
+        # los cambios en los carritos para las métricas, registran las consultas lentas e
+        # invalidan los usuarios en caché
+        from . import (  # noqa: F401
+            autenticacion, cache_paginas, catalogo, consultas_lentas, metricas, miniaturas, perfilado,
+        )
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .metricas import registrar_cache
+from .models import PerfilUsuario
+
+
+def _clave(usuario_id):
+    return f"usuario:{usuario_id}"
+
+
+def invalidar_usuarios(ids):
+    """
+    Saca de la caché a los usuarios indicados. Hace falta después de
+    cambiarlos con QuerySet.update() (User o PerfilUsuario), que no envía
+    post_save: si no, un usuario desactivado seguiría entrando hasta
+    USUARIO_CACHE_SEGUNDOS.
+    """
+    cache.delete_many([_clave(usuario_id) for usuario_id in ids])
+
+
+class UsuarioEnCacheBackend(ModelBackend):
+    """
+    ModelBackend que carga al usuario de la sesión junto con su perfil (un
+    solo JOIN) y lo guarda en caché USUARIO_CACHE_SEGUNDOS. Con la caché
+    caliente, request.user y request.user.perfil no cuestan consultas.
+
+    Se invalida al guardar o borrar el usuario o su perfil (cambio de
+    contraseña incluido, así que las sesiones viejas dejan de valer); los
+    cambios con update() llaman a invalidar_usuarios(). Con
+    varios procesos hace falta una caché compartida (CACHE_BACKEND de
+    Redis o Memcached) para que la invalidación llegue a todos.
+    """
+
+    def get_user(self, user_id):
+        clave = _clave(user_id)
+        usuario = cache.get(clave)
+        registrar_cache('usuario', usuario is not None)
+        if usuario is None:
+            try:
+                usuario = User._default_manager.select_related('perfil').get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(clave, usuario, settings.USUARIO_CACHE_SEGUNDOS)
+        return usuario if self.user_can_authenticate(usuario) else None
+
+
+@receiver([post_save, post_delete], sender=User)
+def usuario_modificado(sender, instance, **kwargs):
+    cache.delete(_clave(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=PerfilUsuario)
+def perfil_modificado(sender, instance, **kwargs):
+    cache.delete(_clave(instance.usuario_id))
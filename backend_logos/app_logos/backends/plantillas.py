@@ -0,0 +1,30 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from app_logos.perfilado import fase, medir_procesador
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        with fase('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """
+    Motor de plantillas de Django que reporta a ServerTimingMiddleware el
+    tiempo de renderizado ('tpl') y, por separado, el de los procesadores
+    de contexto ('ctx'), que Django ejecuta dentro del renderizado.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        # Engine.template_context_processors es un cached_property: se reemplaza el valor ya calculado
+        self.engine.__dict__['template_context_processors'] = tuple(
+            medir_procesador(procesador) for procesador in self.engine.template_context_processors
+        )
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name).template, self)
@@ -0,0 +1,49 @@
+from django.db.backends.sqlite3 import base
+
+# Ajustes aplicados a cada conexión nueva. Se pueden cambiar (o añadir otros)
+# con OPTIONS['pragmas'] en DATABASES.
+PRAGMAS = {
+    # Los lectores no bloquean al escritor ni el escritor a los lectores
+    'journal_mode': 'WAL',
+    # Con WAL, NORMAL solo sincroniza en los checkpoints: una caída del sistema
+    # puede perder la última transacción, nunca corromper la base
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    # Negativo = KiB: unos 20 MB de caché de páginas por conexión
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 20000,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Backend sqlite3 de Django con los PRAGMA de PRAGMAS y transacciones
+    que toman el bloqueo de escritura al empezar (BEGIN IMMEDIATE).
+
+    Con el BEGIN diferido por defecto, una transacción que primero lee y
+    luego escribe (checkout: revisar stock y descontarlo) puede encontrarse
+    con que otro escritor ya avanzó; SQLite la aborta con "database is
+    locked" sin esperar a busy_timeout. Con BEGIN IMMEDIATE los escritores
+    se forman al inicio de la transacción y esperan su turno.
+    """
+
+    def get_connection_params(self):
+        parametros = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **parametros.pop('pragmas', {})}
+        # El timeout de sqlite3.connect es el mismo busy_timeout, en segundos
+        parametros.setdefault('timeout', self.pragmas['busy_timeout'] / 1000)
+        return parametros
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.pragmas
+        if self.is_in_memory_db():
+            # Las bases en memoria (pruebas) no admiten WAL ni mmap
+            pragmas = {nombre: valor for nombre, valor in pragmas.items() if nombre not in ('journal_mode', 'mmap_size')}
+        for nombre, valor in pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,104 @@
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .catalogo import version_catalogo
+from .metricas import registrar_cache
+from .models import Carrito
+
+# El token CSRF es propio de cada visitante: se quita antes de guardar la página
+# y el navegador lo pide después a la vista estado_sesion.
+TOKEN_CSRF = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+# Plantillas y estáticos cambian con cada despliegue; sin VERSION_SITIO se usa el
+# arranque del proceso para que un ETag viejo nunca sobreviva a un reinicio.
+VERSION_SITIO = settings.VERSION_SITIO or str(int(time.time()))
+
+
+def _es_anonimo(request):
+    # Sin cookie de sesión no hay usuario que buscar: se evita tocar la base de datos
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    return not request.user.is_authenticated
+
+
+def version_carrito(usuario_id):
+    clave = f"carrito:version:{usuario_id}"
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, int(time.time()), None)
+        version = cache.get(clave)
+    return version
+
+
+@receiver([post_save, post_delete], sender=Carrito)
+def carrito_modificado(sender, instance, **kwargs):
+    try:
+        cache.incr(f"carrito:version:{instance.usuario_id}")
+    except ValueError:
+        pass
+
+
+def etag_pagina(request, *args, **kwargs):
+    """
+    ETag de las páginas del catálogo, calculado sin renderizar: cambia con la
+    URL, la versión del catálogo, el despliegue y, para usuarios con sesión,
+    su identidad y su carrito (el navbar muestra ambos). Sin ETag cuando hay
+    mensajes pendientes.
+    """
+    if CookieStorage.cookie_name in request.COOKIES:
+        return None
+    partes = [VERSION_SITIO, request.get_full_path(), str(version_catalogo())]
+    if not _es_anonimo(request):
+        usuario = request.user
+        partes += [str(usuario.pk), usuario.username, str(usuario.is_staff), str(version_carrito(usuario.pk))]
+    return hashlib.md5('|'.join(partes).encode()).hexdigest()
+
+
+def _clave(request):
+    ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"pagina:{version_catalogo()}:{ruta}"
+
+
+def cache_anonimo(vista):
+    """
+    Guarda la página completa para los GET de visitantes anónimos, con clave
+    por ruta, query string y versión del catálogo. Una página en caché se
+    devuelve sin pasar por el ORM ni por las plantillas; lo que depende del
+    visitante (token CSRF, contador del carrito) lo completa base.html con
+    una petición a estado_sesion.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        # Con mensajes pendientes la página no es la genérica
+        if (request.method != 'GET' or CookieStorage.cookie_name in request.COOKIES
+                or not _es_anonimo(request)):
+            return vista(request, *args, **kwargs)
+
+        clave = _clave(request)
+        guardada = cache.get(clave)
+        registrar_cache('pagina', guardada is not None)
+        if guardada is not None:
+            response = HttpResponse(guardada['contenido'], content_type=guardada['tipo'])
+        else:
+            request.cache_anonima = True
+            response = vista(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(clave, {
+                    'contenido': TOKEN_CSRF.sub(rb'\1\2', response.content),
+                    'tipo': response['Content-Type'],
+                }, settings.CACHE_PAGINAS_SEGUNDOS)
+        # La misma URL muestra otra cosa a un usuario con sesión
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    return envoltura
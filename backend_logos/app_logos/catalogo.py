@@ -0,0 +1,89 @@
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value, DecimalField
+from django.db.models.functions import Greatest, Round
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .metricas import registrar_cache
+from .models import Autor, Categoria, Libro
+
+CLAVE_VERSION = 'catalogo:version'
+CENTAVO = Decimal('0.01')
+
+
+def version_catalogo():
+    """
+    Número que cambia cada vez que se modifica el catálogo. Las cachés que
+    dependen de libros, autores o categorías lo incluyen en su clave, así que
+    invalidarlas es solo cuestión de incrementarlo.
+    """
+    version = cache.get(CLAVE_VERSION)
+    registrar_cache('version_catalogo', version is not None)
+    if version is None:
+        # Se parte de la hora actual para no reutilizar versiones tras un reinicio de la caché
+        cache.add(CLAVE_VERSION, int(time.time()), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar_catalogo():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, int(time.time()), None)
+
+
+# Guardados individuales (admin, CRUD de productos). Las operaciones masivas usan
+# update()/bulk_create(), que no disparan señales, e invalidan una sola vez al final.
+@receiver([post_save, post_delete], sender=Libro)
+@receiver([post_save, post_delete], sender=Autor)
+@receiver([post_save, post_delete], sender=Categoria)
+def catalogo_modificado(sender, **kwargs):
+    invalidar_catalogo()
+
+
+def filtrar_libros(categorias=None, autores=None, ids=None):
+    libros = Libro.objects.all()
+    if categorias:
+        libros = libros.filter(categoria_id__in=categorias)
+    if autores:
+        libros = libros.filter(autor_id__in=autores)
+    if ids:
+        libros = libros.filter(id__in=ids)
+    return libros
+
+
+def ajustar_libros(libros, porcentaje=None, monto=None, stock=None):
+    """
+    Aplica en un solo UPDATE un cambio de precio (porcentual o absoluto) y/o
+    un ajuste de stock a todos los libros del queryset. Precio y stock nunca
+    quedan por debajo de cero. Devuelve el número de libros modificados.
+    """
+    cambios = {}
+    salida = DecimalField(max_digits=10, decimal_places=2)
+    cero = Value(Decimal('0'), output_field=salida)
+    precio = None
+    if porcentaje is not None:
+        factor = Value(1 + Decimal(porcentaje) / 100, output_field=DecimalField(max_digits=12, decimal_places=6))
+        precio = F('precio') * factor
+    elif monto is not None:
+        # ROUND de SQLite redondea las mitades hacia arriba; el monto se redondea igual
+        precio = F('precio') + Value(Decimal(monto).quantize(CENTAVO, ROUND_HALF_UP), output_field=salida)
+    if precio is not None:
+        # SQLite guarda los decimales como REAL: sin redondear, una suma puede dejar 20.009999...
+        cambios['precio'] = Greatest(Round(precio, 2, output_field=salida), cero)
+    if stock:
+        cambios['stock'] = Greatest(F('stock') + stock, 0)
+    if not cambios:
+        return 0
+
+    with transaction.atomic():
+        modificados = libros.update(**cambios)
+    # Una sola invalidación por lote, sin importar cuántos libros cambiaron
+    if modificados:
+        invalidar_catalogo()
+    return modificados
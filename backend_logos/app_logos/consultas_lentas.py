@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ConsultaLenta
+from .perfilado import en_peticion, vista_actual
+
+logger = logging.getLogger('app_logos.consultas_lentas')
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# IN (?, ?, ?) con cualquier número de elementos es la misma consulta
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+# Control de transacciones: su tiempo es la espera del bloqueo, no la consulta, y cuando
+# BEGIN tarda todavía no hay bloque atómico, así que guardar la escribiría dentro de ella
+_CONTROL = re.compile(r'\s*(?:BEGIN|COMMIT|END|ROLLBACK|SAVEPOINT|RELEASE)\b', re.I)
+
+# Módulos que envuelven la ejecución de consultas: no cuentan como su origen
+_INTERNOS = tuple(os.path.join('app_logos', nombre) for nombre in ('consultas_lentas.py', 'perfilado.py', 'backends'))
+
+# True mientras se ejecuta el EXPLAIN o se guardan las consultas: no deben registrarse a sí mismas
+_ocupado = ContextVar('consultas_lentas_ocupado', default=False)
+# Plan ya obtenido por huella, para no repetir EXPLAIN en cada aparición
+_planes = {}
+# Tope de planes en memoria: al llenarse se descarta el más viejo
+MAXIMO_PLANES = 1000
+# Consultas detectadas y todavía sin guardar, por hilo: cada petición guarda las suyas al
+# terminar (fuera de su transacción) y un comando, al confirmar la transacción en curso.
+_hilo = threading.local()
+# Tope por hilo: si no se pueden guardar se pierden las más viejas (siguen en el log)
+MAXIMO_PENDIENTES = 1000
+
+
+def _pendientes():
+    if not hasattr(_hilo, 'pendientes'):
+        _hilo.pendientes = deque(maxlen=MAXIMO_PENDIENTES)
+    return _hilo.pendientes
+
+
+def normalizar(sql):
+    """
+    Reemplaza valores por ? y colapsa las listas de IN, para que la misma
+    consulta con otros valores tenga la misma huella.
+    """
+    sql = sql.replace('%s', '?')
+    sql = _LITERALES.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def forma_parametros(params, many):
+    # Solo los tipos: los valores pueden ser datos personales (correos, direcciones)
+    if many:
+        return f"executemany ({len(params)} filas)" if isinstance(params, (list, tuple)) else "executemany"
+    if isinstance(params, dict):
+        return ', '.join(f"{clave}: {type(valor).__name__}" for clave, valor in params.items())
+    return ', '.join(type(valor).__name__ for valor in params or ())
+
+
+def origen():
+    """Primera línea del proyecto (fuera de Django y de este módulo) en la pila."""
+    base = str(settings.BASE_DIR)
+    marco = sys._getframe()
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(base) and 'site-packages' not in archivo and not any(i in archivo for i in _INTERNOS):
+            return f"{os.path.relpath(archivo, base)}:{marco.f_lineno} en {marco.f_code.co_name}"
+        marco = marco.f_back
+    return ''
+
+
+def explicar(connection, sql, params):
+    # En un cursor aparte: el de la consulta todavía tiene filas sin leer
+    if sql.lstrip()[:6].upper() not in ('SELECT', 'WITH') or not hasattr(connection.ops, 'explain_query_prefix'):
+        return ''
+    try:
+        with connection.cursor() as cursor:
+            if connection.in_atomic_block:
+                # En PostgreSQL un error abortaría la transacción de la petición
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            else:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            # SQLite: (id, padre, -, detalle); PostgreSQL: una columna de texto
+            return '\n'.join(str(fila[-1]) for fila in cursor.fetchall())
+    except DatabaseError as error:
+        return f"(no se pudo obtener el plan: {error})"
+
+
+def registrar_si_lenta(execute, sql, params, many, context):
+    if _ocupado.get() or _CONTROL.match(sql):
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    resultado = execute(sql, params, many, context)
+    duracion = (time.perf_counter() - inicio) * 1000
+    if duracion >= settings.CONSULTAS_LENTAS_MS:
+        token = _ocupado.set(True)
+        try:
+            _registrar(context['connection'], sql, params, many, duracion)
+        finally:
+            _ocupado.reset(token)
+    return resultado
+
+
+def _registrar(connection, sql, params, many, duracion):
+    normalizada = normalizar(sql)
+    huella = hashlib.md5(normalizada.encode()).hexdigest()
+    if huella not in _planes:
+        if len(_planes) >= MAXIMO_PLANES:
+            _planes.pop(next(iter(_planes), None), None)
+        _planes[huella] = '' if many else explicar(connection, sql, params)
+    consulta = {
+        'huella': huella,
+        'ms': round(duracion, 1),
+        'sql': normalizada,
+        'parametros': forma_parametros(params, many),
+        'vista': vista_actual() or '',
+        'origen': origen(),
+        'plan': _planes[huella],
+    }
+    logger.warning(json.dumps(consulta, ensure_ascii=False))
+    _pendientes().append(consulta)
+    if not en_peticion():
+        # Comandos, tareas y hilos propios no envían request_finished: se guarda al
+        # confirmar la transacción en curso, o ya mismo si no hay ninguna.
+        transaction.on_commit(guardar, using=connection.alias)
+
+
+@receiver(connection_created)
+def instalar_registro(sender, connection, **kwargs):
+    if registrar_si_lenta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_si_lenta)
+
+
+@receiver(request_finished)
+def guardar_pendientes(sender, **kwargs):
+    """
+    Acumula en ConsultaLenta las consultas detectadas durante la petición.
+    Se hace al terminarla para no escribir dentro de su transacción ni
+    sumar estas escrituras a su tiempo de respuesta.
+    """
+    guardar()
+
+
+def guardar():
+    """Guarda en ConsultaLenta las consultas pendientes de este hilo."""
+    pendientes = _pendientes()
+    if not pendientes:
+        return
+    token = _ocupado.set(True)
+    try:
+        while pendientes:
+            consulta = pendientes.popleft()
+            ms = consulta.pop('ms')
+            actualizadas = ConsultaLenta.objects.filter(huella=consulta['huella']).update(
+                veces=F('veces') + 1, total_ms=F('total_ms') + ms, max_ms=Greatest('max_ms', Value(ms)),
+                ultima_vez=timezone.now(), vista=consulta['vista'], origen=consulta['origen'],
+            )
+            if not actualizadas:
+                ConsultaLenta.objects.get_or_create(huella=consulta['huella'], defaults={
+                    **consulta, 'veces': 1, 'total_ms': ms, 'max_ms': ms, 'ultima_vez': timezone.now(),
+                })
+    except DatabaseError:
+        # Sin la tabla (migración pendiente) las consultas quedan solo en el log
+        logger.exception("No se pudieron guardar las consultas lentas")
+    finally:
+        _ocupado.reset(token)
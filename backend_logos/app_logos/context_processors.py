@@ -1,3 +1,6 @@
+from django.conf import settings
+
+from .catalogo import version_catalogo
 from .models import Carrito
 
 def carrito_context(request):
@@ -12,3 +15,13 @@ def carrito_context(request):
         num_items = 0
     
     return {'num_items_carrito': num_items}
+
+def catalogo_context(request):
+    """
+    Datos para las claves de {% cache %}: los fragmentos que muestran libros
+    incluyen la versión del catálogo y se invalidan solos cuando éste cambia.
+    """
+    return {
+        'version_catalogo': version_catalogo(),
+        'cache_fragmentos': settings.CACHE_FRAGMENTOS_SEGUNDOS,
+    }
@@ -2,6 +2,9 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import Autor, Categoria, Libro
+from .importacion import separar_nombre_autor
 
 class RegistroForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={
@@ -40,4 +43,94 @@ class RegistroForm(UserCreationForm):
         if password1 and password2 and password1 != password2:
             self.add_error('password2', "Las contraseñas no coinciden.")
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class LibroForm(forms.ModelForm):
+    # El autor se captura como texto libre ("Nombre Apellido") y se resuelve al guardar
+    autor = forms.CharField(max_length=201)
+
+    class Meta:
+        model = Libro
+        fields = ['titulo', 'categoria', 'descripcion', 'precio', 'stock', 'imagen', 'activo', 'destacado']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Si no se sube portada se usa la imagen por defecto del modelo (o la actual al editar)
+        self.fields['imagen'].required = False
+        if self.instance.pk:
+            self.initial.setdefault('autor', str(self.instance.autor).strip())
+
+    def clean_autor(self):
+        nombre, apellido = separar_nombre_autor(self.cleaned_data.get('autor'))
+        if not nombre:
+            raise ValidationError("Indica el autor del libro.")
+        return nombre, apellido
+
+    def save(self, commit=True):
+        nombre, apellido = self.cleaned_data['autor']
+        # En una transacción la búsqueda va al primario: una réplica atrasada duplicaría al autor
+        with transaction.atomic():
+            autor = Autor.objects.filter(nombre__iexact=nombre, apellido__iexact=apellido).first()
+            if autor is None:
+                autor = Autor.objects.create(nombre=nombre, apellido=apellido)
+            self.instance.autor = autor
+            return super().save(commit=commit)
+
+
+class ImportarCatalogoForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo del catálogo",
+        help_text="CSV, JSON o JSON Lines con las columnas titulo, autor, categoria, descripcion, precio, stock, activo, destacado.",
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.json', '.jsonl')):
+            raise ValidationError("El archivo debe ser .csv, .json o .jsonl.")
+        return archivo
+
+
+def _lista_ids(texto):
+    try:
+        return [int(valor) for valor in texto.replace(',', ' ').split()]
+    except ValueError:
+        raise ValidationError("Escribe los IDs como números separados por comas.")
+
+
+class AjusteCatalogoForm(forms.Form):
+    TIPO_PRECIO_CHOICES = [
+        ('', 'Sin cambio de precio'),
+        ('porcentaje', 'Porcentaje (%)'),
+        ('monto', 'Monto fijo ($)'),
+    ]
+
+    categorias = forms.ModelMultipleChoiceField(queryset=Categoria.objects.all(), required=False)
+    autores = forms.CharField(required=False, help_text="IDs de autor separados por comas.")
+    ids = forms.CharField(required=False, help_text="IDs de libro separados por comas.")
+    tipo_precio = forms.ChoiceField(choices=TIPO_PRECIO_CHOICES, required=False)
+    valor_precio = forms.DecimalField(max_digits=10, decimal_places=2, required=False)
+    stock = forms.IntegerField(required=False, help_text="Unidades a sumar (o restar, con signo negativo).")
+
+    def clean_autores(self):
+        return _lista_ids(self.cleaned_data.get('autores', ''))
+
+    def clean_ids(self):
+        return _lista_ids(self.cleaned_data.get('ids', ''))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not (cleaned_data.get('categorias') or cleaned_data.get('autores') or cleaned_data.get('ids')):
+            raise ValidationError("Selecciona al menos una categoría, un autor o una lista de IDs.")
+        if cleaned_data.get('tipo_precio') and cleaned_data.get('valor_precio') is None:
+            self.add_error('valor_precio', "Indica el valor del cambio de precio.")
+        if not cleaned_data.get('tipo_precio') and not cleaned_data.get('stock'):
+            raise ValidationError("No hay ningún cambio que aplicar.")
+        return cleaned_data
+
+    def ajustes(self):
+        tipo = self.cleaned_data.get('tipo_precio')
+        return {
+            'porcentaje': self.cleaned_data['valor_precio'] if tipo == 'porcentaje' else None,
+            'monto': self.cleaned_data['valor_precio'] if tipo == 'monto' else None,
+            'stock': self.cleaned_data.get('stock'),
+        }
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_logos.catalogo import filtrar_libros, ajustar_libros
+
+
+def _ids(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+class Command(BaseCommand):
+    help = "Cambia precios y/o stock de un conjunto de libros con un solo UPDATE."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=_ids, default=[], help="IDs de categoría separados por comas.")
+        parser.add_argument('--autores', type=_ids, default=[], help="IDs de autor separados por comas.")
+        parser.add_argument('--ids', type=_ids, default=[], help="IDs de libro separados por comas.")
+        precio = parser.add_mutually_exclusive_group()
+        precio.add_argument('--porcentaje', type=Decimal, help="Cambio porcentual del precio (p. ej. 10 o -15).")
+        precio.add_argument('--monto', type=Decimal, help="Cambio absoluto del precio (p. ej. 20 o -5.50).")
+        parser.add_argument('--stock', type=int, help="Unidades a sumar al stock (negativo para restar).")
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra cuántos libros se verían afectados.")
+
+    def handle(self, *args, **options):
+        if not (options['categorias'] or options['autores'] or options['ids']):
+            raise CommandError("Indica --categorias, --autores o --ids.")
+        if options['porcentaje'] is None and options['monto'] is None and not options['stock']:
+            raise CommandError("Indica --porcentaje, --monto o --stock.")
+
+        libros = filtrar_libros(options['categorias'], options['autores'], options['ids'])
+        if options['dry_run']:
+            self.stdout.write(f"Libros afectados: {libros.count()}")
+            return
+
+        modificados = ajustar_libros(
+            libros,
+            porcentaje=options['porcentaje'],
+            monto=options['monto'],
+            stock=options['stock'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Se actualizaron {modificados} libros."))
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_logos.models import Orden, DetalleOrden, OrdenArchivada, DetalleOrdenArchivado
+
+ESTADOS_ARCHIVABLES = ('entregado', 'cancelado')
+
+
+class Command(BaseCommand):
+    help = "Mueve las órdenes entregadas o canceladas más antiguas a las tablas de archivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'PEDIDOS_ARCHIVO_DIAS', 365),
+            help="Antigüedad mínima (en días) de las órdenes a archivar.",
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help="Número de órdenes movidas por transacción.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo muestra cuántas órdenes se archivarían.",
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        candidatas = Orden.objects.filter(estado__in=ESTADOS_ARCHIVABLES, fecha_orden__lt=limite)
+
+        if options['dry_run']:
+            self.stdout.write(f"Órdenes a archivar: {candidatas.count()}")
+            return
+
+        total = 0
+        while True:
+            ids = list(candidatas.order_by('id').values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            self._archivar_lote(ids)
+            total += len(ids)
+            self.stdout.write(f"  {total} órdenes archivadas...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archivado completo: {total} órdenes movidas."))
+
+    @transaction.atomic
+    def _archivar_lote(self, ids):
+        ordenes = Orden.objects.filter(id__in=ids)
+        OrdenArchivada.objects.bulk_create([
+            OrdenArchivada(
+                id=orden.id,
+                cliente_id=orden.cliente_id,
+                fecha_orden=orden.fecha_orden,
+                total=orden.total,
+                estado=orden.estado,
+                direccion_envio=orden.direccion_envio,
+                metodo_pago=orden.metodo_pago,
+                banco_tarjeta=orden.banco_tarjeta,
+                subtotal=orden.subtotal,
+                costo_envio=orden.costo_envio,
+            )
+            for orden in ordenes
+        ])
+        DetalleOrdenArchivado.objects.bulk_create([
+            DetalleOrdenArchivado(
+                orden_id=detalle.orden_id,
+                libro_id=detalle.libro_id,
+                cantidad=detalle.cantidad,
+                precio_unidad=detalle.precio_unidad,
+                subtotal=detalle.subtotal,
+            )
+            for detalle in DetalleOrden.objects.filter(orden_id__in=ids)
+        ])
+        DetalleOrden.objects.filter(orden_id__in=ids).delete()
+        ordenes.delete()
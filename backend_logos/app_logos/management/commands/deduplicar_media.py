@@ -0,0 +1,74 @@
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_logos.catalogo import invalidar_catalogo
+from app_logos.miniaturas import ANCHOS, FORMATOS, nombre_variante
+from app_logos.models import Libro
+from app_logos.storage import es_nombre_por_contenido, hash_contenido, nombre_por_contenido
+
+
+class Command(BaseCommand):
+    help = ("Renombra las portadas existentes según el hash de su contenido, "
+            "elimina los duplicados y actualiza los libros que las usan.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra lo que se haría.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        nombres = Libro.objects.exclude(imagen='').values_list('imagen', flat=True).distinct()
+        cambios = {}
+        for nombre in nombres.iterator():
+            if es_nombre_por_contenido(nombre) or not default_storage.exists(nombre):
+                continue
+            with default_storage.open(nombre, 'rb') as archivo:
+                cambios[nombre] = nombre_por_contenido(nombre, hash_contenido(archivo))
+
+        destinos = set(cambios.values())
+        self.stdout.write(f"Portadas a renombrar: {len(cambios)} -> {len(destinos)} archivos únicos.")
+        if dry_run or not cambios:
+            return
+
+        # Primero se copian los archivos con su nombre nuevo; los viejos siguen en su lugar
+        duplicados = 0
+        for origen, destino in cambios.items():
+            if not self._copiar(origen, destino):
+                duplicados += 1
+            for vieja, nueva in self._miniaturas(origen, destino):
+                self._copiar(vieja, nueva)
+
+        with transaction.atomic():
+            for origen, destino in cambios.items():
+                Libro.objects.filter(imagen=origen).update(imagen=destino)
+            # Los viejos se borran solo si las filas quedaron guardadas: si la transacción
+            # falla, los libros siguen apuntando a archivos que siguen en disco
+            transaction.on_commit(lambda: self._borrar(cambios))
+        # update() no dispara señales: las tarjetas en caché aún apuntan a los nombres viejos
+        invalidar_catalogo()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {len(cambios)} portadas renombradas, {duplicados} duplicados eliminados."
+        ))
+
+    def _copiar(self, origen, destino):
+        """Copia origen con el nombre nuevo; False si ya existía (mismo contenido)."""
+        if default_storage.exists(destino):
+            return False
+        shutil.copyfile(default_storage.path(origen), default_storage.path(destino))
+        return True
+
+    def _miniaturas(self, origen, destino):
+        for ancho in ANCHOS:
+            for formato in FORMATOS:
+                vieja = nombre_variante(origen, ancho, formato)
+                if default_storage.exists(vieja):
+                    yield vieja, nombre_variante(destino, ancho, formato)
+
+    def _borrar(self, cambios):
+        for origen, destino in cambios.items():
+            for vieja, _ in list(self._miniaturas(origen, destino)):
+                default_storage.delete(vieja)
+            default_storage.delete(origen)
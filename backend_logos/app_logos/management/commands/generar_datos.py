@@ -0,0 +1,225 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app_logos.catalogo import invalidar_catalogo
+from app_logos.models import Autor, Carrito, Categoria, DetalleOrden, Libro, Orden, PerfilUsuario
+
+PREFIJO_USUARIO = 'datos_'
+PREFIJO_SLUG = 'datos-'
+CLAVE_USUARIOS = 'datos-de-prueba'
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carmen', 'Juan', 'Lucía', 'Pedro', 'Elena', 'Jorge',
+           'Sofía', 'Miguel', 'Isabel', 'Diego', 'Valeria', 'Andrés', 'Paula', 'Ricardo', 'Julia', 'Tomás']
+APELLIDOS = ['García', 'Martínez', 'López', 'Hernández', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+             'Ramírez', 'Torres', 'Flores', 'Rivera', 'Gómez', 'Díaz', 'Cruz', 'Morales', 'Reyes', 'Ortiz']
+TEMAS = ['Novela', 'Poesía', 'Ensayo', 'Historia', 'Ciencia', 'Filosofía', 'Arte', 'Infantil',
+         'Viajes', 'Cocina', 'Biografía', 'Teatro', 'Economía', 'Psicología', 'Tecnología', 'Música']
+PALABRAS = ['sombra', 'río', 'ciudad', 'memoria', 'viento', 'noche', 'jardín', 'silencio', 'mar', 'fuego',
+            'camino', 'espejo', 'tiempo', 'luz', 'bosque', 'invierno', 'puerta', 'sueño', 'isla', 'voz']
+CIUDADES = ['Ciudad de México', 'Guadalajara', 'Monterrey', 'Puebla', 'Mérida', 'Querétaro', 'Oaxaca']
+BANCOS = ['BBVA', 'Banorte', 'Santander', 'HSBC', 'Citibanamex', 'Scotiabank']
+
+
+@contextmanager
+def fechas_manuales(*campos):
+    """
+    bulk_create respeta auto_now_add y pondría la misma fecha a todo; mientras
+    dura el bloque se usan las fechas asignadas a mano.
+    """
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ("Genera datos sintéticos reproducibles (misma semilla, mismos datos) para medir la "
+            "aplicación a escala: autores, árbol de categorías, libros, usuarios, órdenes con "
+            "sus líneas y carritos activos. Úsalo sobre una base de pruebas, no la de producción.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--autores', type=int, default=10_000)
+        parser.add_argument('--libros', type=int, default=100_000)
+        parser.add_argument('--categorias', type=int, default=12, help="Categorías raíz.")
+        parser.add_argument('--subcategorias', type=int, default=4, help="Hijas por categoría en cada nivel.")
+        parser.add_argument('--niveles', type=int, default=3, help="Profundidad del árbol de categorías.")
+        parser.add_argument('--usuarios', type=int, default=50_000)
+        parser.add_argument('--ordenes', type=int, default=1_000_000)
+        parser.add_argument('--lineas', type=int, default=4, help="Máximo de líneas por orden.")
+        parser.add_argument('--carritos', type=int, default=5_000, help="Usuarios con carrito activo.")
+        parser.add_argument('--dias', type=int, default=3 * 365, help="Antigüedad máxima de libros y órdenes.")
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=10_000, help="Objetos por bulk_create.")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=PREFIJO_USUARIO).exists():
+            raise CommandError("La base ya tiene datos generados (usuarios 'datos_*').")
+        # Una corrida que falló a medias pudo dejar categorías sin usuarios
+        if Categoria.objects.filter(slug__startswith=PREFIJO_SLUG).exists():
+            raise CommandError("La base ya tiene datos generados (categorías 'datos-*').")
+
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.ahora = timezone.now()
+        self.dias = options['dias']
+        inicio = time.perf_counter()
+
+        campos_fecha = [
+            Libro._meta.get_field('fecha_creacion'),
+            Orden._meta.get_field('fecha_orden'),
+            Carrito._meta.get_field('fecha_agregado'),
+        ]
+        with transaction.atomic(), fechas_manuales(*campos_fecha):
+            autores = self._etapa("Autores", self._autores, options['autores'])
+            categorias = self._etapa(
+                "Categorías", self._categorias, options['categorias'], options['subcategorias'], options['niveles'],
+            )
+            libros = self._etapa("Libros", self._libros, options['libros'], autores, categorias)
+            usuarios = self._etapa("Usuarios", self._usuarios, options['usuarios'])
+            self._etapa("Órdenes", self._ordenes, options['ordenes'], options['lineas'], usuarios, libros)
+            self._etapa("Carritos", self._carritos, options['carritos'], usuarios, libros)
+
+        if connection.vendor == 'sqlite':
+            # Estadísticas para el planificador, como tendría una base en producción
+            self._etapa("ANALYZE", lambda: connection.cursor().execute('ANALYZE'))
+        invalidar_catalogo()
+        self.stdout.write(self.style.SUCCESS(f"Datos generados en {time.perf_counter() - inicio:.1f} s."))
+
+    def _etapa(self, nombre, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        cantidad = f": {len(resultado)}" if isinstance(resultado, (list, dict)) else ""
+        self.stdout.write(f"  {nombre}{cantidad} ({time.perf_counter() - inicio:.1f} s)")
+        return resultado
+
+    def _fecha(self, dias=None):
+        return self.ahora - timedelta(seconds=self.azar.randrange((dias or self.dias) * 86400))
+
+    def _autores(self, cantidad):
+        azar = self.azar
+        objetos = [Autor(nombre=azar.choice(NOMBRES), apellido=f"{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}")
+                   for _ in range(cantidad)]
+        return [autor.pk for autor in Autor.objects.bulk_create(objetos, batch_size=self.lote)]
+
+    def _categorias(self, raices, hijas, niveles):
+        # Nivel por nivel: cada nivel necesita los ids del anterior para categoria_padre
+        hojas = []
+        nivel = [Categoria(nombre=f"{TEMAS[i % len(TEMAS)]} {i + 1}", slug=f"{PREFIJO_SLUG}{i + 1}") for i in range(raices)]
+        for profundidad in range(niveles):
+            nivel = Categoria.objects.bulk_create(nivel)
+            if profundidad == niveles - 1:
+                hojas = nivel
+                break
+            nivel = [
+                Categoria(nombre=f"{padre.nombre}.{j + 1}", slug=f"{padre.slug}-{j + 1}", categoria_padre_id=padre.pk)
+                for padre in nivel for j in range(hijas)
+            ]
+        return [categoria.pk for categoria in hojas]
+
+    def _libros(self, cantidad, autores, categorias):
+        azar = self.azar
+        precios = {}
+        for inicio in range(0, cantidad, self.lote):
+            objetos = []
+            for _ in range(inicio, min(inicio + self.lote, cantidad)):
+                titulo = f"{azar.choice(PALABRAS).capitalize()} de {azar.choice(PALABRAS)}"
+                if azar.random() < 0.5:
+                    titulo = f"El {titulo.lower()} y la {azar.choice(PALABRAS)}"
+                objetos.append(Libro(
+                    titulo=titulo,
+                    autor_id=azar.choice(autores),
+                    categoria_id=azar.choice(categorias),
+                    descripcion=" ".join(azar.choices(PALABRAS, k=30)),
+                    precio=Decimal(azar.randrange(9900, 129900)) / 100,
+                    stock=azar.choice((0, 1, 3, 5, 10, 25, 50)),
+                    activo=azar.random() < 0.95,
+                    destacado=azar.random() < 0.01,
+                    fecha_creacion=self._fecha(),
+                ))
+            for libro in Libro.objects.bulk_create(objetos):
+                precios[libro.pk] = libro.precio
+        return precios
+
+    def _usuarios(self, cantidad):
+        azar = self.azar
+        # Un solo hash para todos: calcular uno por usuario tardaría horas
+        clave = make_password(CLAVE_USUARIOS)
+        ids = []
+        for inicio in range(0, cantidad, self.lote):
+            usuarios = User.objects.bulk_create([
+                User(username=f"{PREFIJO_USUARIO}{i}", email=f"{PREFIJO_USUARIO}{i}@example.com", password=clave,
+                     first_name=azar.choice(NOMBRES), last_name=azar.choice(APELLIDOS),
+                     date_joined=self._fecha())
+                for i in range(inicio, min(inicio + self.lote, cantidad))
+            ])
+            # bulk_create no dispara la señal que crea el perfil
+            PerfilUsuario.objects.bulk_create([
+                PerfilUsuario(usuario_id=usuario.pk, ciudad=azar.choice(CIUDADES), codigo_postal=f"{azar.randrange(1000, 99999):05d}",
+                              direccion_envio=f"Calle {azar.choice(PALABRAS).capitalize()} {azar.randrange(1, 999)}")
+                for usuario in usuarios
+            ])
+            ids.extend(usuario.pk for usuario in usuarios)
+        return ids
+
+    def _ordenes(self, cantidad, max_lineas, usuarios, precios):
+        azar = self.azar
+        libros = list(precios)
+        lineas = 0
+        for inicio in range(0, cantidad, self.lote):
+            ordenes, detalles = [], []
+            for _ in range(inicio, min(inicio + self.lote, cantidad)):
+                fecha = self._fecha()
+                antiguedad = (self.ahora - fecha).days
+                # Las órdenes viejas ya se entregaron; las recientes siguen en proceso
+                if antiguedad > 30:
+                    estado = 'cancelado' if azar.random() < 0.05 else 'entregado'
+                else:
+                    estado = azar.choice(('pendiente', 'pagado', 'enviado', 'entregado'))
+                renglones = []
+                for libro_id in azar.sample(libros, azar.randint(1, max_lineas)):
+                    cantidad_libro = azar.choice((1, 1, 1, 2, 3))
+                    precio = precios[libro_id]
+                    renglones.append((libro_id, cantidad_libro, precio, precio * cantidad_libro))
+                subtotal = sum(renglon[3] for renglon in renglones)
+                costo_envio = Decimal(50) if 0 < subtotal < 500 else Decimal(0)
+                ordenes.append(Orden(
+                    cliente_id=azar.choice(usuarios), fecha_orden=fecha, estado=estado,
+                    direccion_envio=f"Calle {azar.choice(PALABRAS).capitalize()} {azar.randrange(1, 999)}, {azar.choice(CIUDADES)}",
+                    banco_tarjeta=azar.choice(BANCOS), subtotal=subtotal, costo_envio=costo_envio, total=subtotal + costo_envio,
+                ))
+                detalles.append(renglones)
+
+            ordenes = Orden.objects.bulk_create(ordenes)
+            objetos = [
+                DetalleOrden(orden_id=orden.pk, libro_id=libro_id, cantidad=cantidad_libro, precio_unidad=precio, subtotal=subtotal)
+                for orden, renglones in zip(ordenes, detalles)
+                for libro_id, cantidad_libro, precio, subtotal in renglones
+            ]
+            DetalleOrden.objects.bulk_create(objetos)
+            lineas += len(objetos)
+            hechas = inicio + len(ordenes)
+            if hechas == cantidad or (inicio // self.lote) % 10 == 9:
+                self.stdout.write(f"    {hechas} órdenes, {lineas} líneas")
+
+    def _carritos(self, cantidad, usuarios, precios):
+        azar = self.azar
+        libros = list(precios)
+        objetos = [
+            Carrito(usuario_id=usuario_id, libro_id=libro_id, cantidad=azar.randint(1, 3), fecha_agregado=self._fecha(14))
+            for usuario_id in azar.sample(usuarios, min(cantidad, len(usuarios)))
+            for libro_id in azar.sample(libros, azar.randint(1, 5))
+        ]
+        Carrito.objects.bulk_create(objetos, batch_size=self.lote)
+        return objetos
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_logos.catalogo import invalidar_catalogo
+from app_logos.miniaturas import generar_variantes_masivo, guardar_metadatos
+from app_logos.models import Libro
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP/JPEG y el marcador borroso de las portadas usando varios procesos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos del pool (por defecto, uno por CPU).")
+        parser.add_argument('--forzar', action='store_true', help="Regenera también las variantes que ya existen.")
+        parser.add_argument('--lote', type=int, default=50, help="Portadas cuyos metadatos se guardan en cada transacción.")
+
+    def handle(self, *args, **options):
+        nombres = Libro.objects.exclude(imagen='').values_list('imagen', flat=True).distinct().iterator()
+        escritos = portadas = 0
+        pendientes = []
+        for nombre, resultado in generar_variantes_masivo(nombres, procesos=options['procesos'], forzar=options['forzar']):
+            if resultado is None:
+                self.stderr.write(f"No existe el archivo {nombre}.")
+                continue
+            pendientes.append((nombre, resultado))
+            escritos += resultado['escritos']
+            portadas += 1
+            if len(pendientes) >= options['lote']:
+                self._guardar(pendientes)
+                pendientes = []
+        self._guardar(pendientes)
+        if portadas:
+            # Dimensiones y marcadores nuevos en las tarjetas que están en caché
+            invalidar_catalogo()
+        self.stdout.write(self.style.SUCCESS(f"Portadas procesadas: {portadas} ({escritos} archivos generados)."))
+
+    def _guardar(self, pendientes):
+        # Una transacción corta por lote: el bloqueo de escritura de SQLite no se retiene
+        # mientras el pool codifica imágenes, así que la tienda puede seguir escribiendo
+        with transaction.atomic():
+            for nombre, resultado in pendientes:
+                guardar_metadatos(nombre, resultado)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_logos.importacion import ImportadorCatalogo, leer_filas, TAMANO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Importa o actualiza libros desde un archivo CSV, JSON o JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo del proveedor.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por lote de inserción.")
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not ruta.lower().endswith(('.csv', '.json', '.jsonl')):
+            raise CommandError("El archivo debe ser .csv, .json o .jsonl.")
+        try:
+            with open(ruta, 'rb') as archivo:
+                resultado = ImportadorCatalogo(tamano_lote=options['lote']).importar(leer_filas(archivo, ruta))
+        except FileNotFoundError:
+            raise CommandError(f"No existe el archivo {ruta}.")
+        except ValueError as error:
+            raise CommandError(f"No se pudo leer {ruta}, no se importó nada: {error}")
+
+        for error in resultado.errores:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada: {resultado.creados} creados, {resultado.actualizados} actualizados, "
+            f"{len(resultado.errores)} filas con error."
+        ))
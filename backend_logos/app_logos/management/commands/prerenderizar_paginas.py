@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch
+
+from app_logos.prerenderizado import guardar
+
+
+class Command(BaseCommand):
+    help = ("Genera el HTML (y sus variantes .gz/.br) de las páginas que no cambian entre despliegues, "
+            "para que PaginasPrerenderizadasMiddleware las sirva a los visitantes anónimos. "
+            "Ejecutar en cada despliegue, después de collectstatic.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paginas', nargs='*',
+            help="Nombres de URL a generar (por defecto, PAGINAS_PRERENDERIZADAS). Las páginas que "
+                 "muestran libros quedarían desactualizadas hasta la siguiente ejecución.",
+        )
+        parser.add_argument('--directorio', default=None, help="Destino (por defecto, PAGINAS_PRERENDERIZADAS_DIR).")
+
+    def handle(self, *args, **options):
+        nombres = options['paginas'] or settings.PAGINAS_PRERENDERIZADAS
+        try:
+            manifiesto = guardar(nombres, options['directorio'])
+        except (NoReverseMatch, ValueError) as error:
+            raise CommandError(error)
+        for ruta, datos in manifiesto.items():
+            self.stdout.write(f"  {ruta} -> {datos['archivo']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Páginas generadas: {len(manifiesto)}. Reinicia el servidor para que se sirvan."
+        ))
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app_logos.catalogo import invalidar_catalogo
+
+
+class Command(BaseCommand):
+    help = ("Copia la base primaria a las réplicas de lectura (DB_REPLICAS) con la API de "
+            "respaldo de SQLite, que da una copia consistente aunque haya escrituras en curso.")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No hay réplicas configuradas (variable de entorno DB_REPLICAS).")
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Solo para SQLite; con otros motores usa su replicación nativa.")
+
+        origen = sqlite3.connect(str(settings.DATABASES['default']['NAME']))
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                ruta = str(settings.DATABASES[alias]['NAME'])
+                destino = sqlite3.connect(ruta)
+                try:
+                    origen.backup(destino, pages=1024)
+                    # La copia conserva el modo del archivo de origen; las réplicas también usan WAL
+                    destino.execute("PRAGMA journal_mode = WAL")
+                finally:
+                    destino.close()
+                self.stdout.write(f"  {alias}: {ruta}")
+        finally:
+            origen.close()
+        # Las páginas cacheadas después de un cambio pudieron leer una réplica atrasada
+        invalidar_catalogo()
+        self.stdout.write(self.style.SUCCESS(f"Réplicas sincronizadas: {len(settings.DATABASE_REPLICAS)}."))
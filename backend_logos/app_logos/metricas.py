@@ -0,0 +1,90 @@
+import os
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, disable_created_metrics, generate_latest,
+    multiprocess,
+)
+
+from .models import Carrito
+
+# Métricas de la tienda para Prometheus, expuestas en /metrics (vista `metricas`).
+#
+# Con varios procesos (gunicorn, uWSGI) cada uno cuenta por separado: hay que
+# definir PROMETHEUS_MULTIPROC_DIR con un directorio vacío antes de arrancar
+# el servidor. Cada proceso escribe ahí sus valores en archivos mmap (sin
+# bloqueos entre procesos) y /metrics los suma. En gunicorn, además:
+#     def child_exit(server, worker):
+#         from prometheus_client import multiprocess
+#         multiprocess.mark_process_dead(worker.pid)
+
+# Las series *_created (hora de creación de cada contador) no se usan y duplican la salida
+disable_created_metrics()
+
+peticion_segundos = Histogram(
+    'logos_peticion_segundos', "Duración de las peticiones por vista.", ['vista', 'metodo'],
+)
+peticiones = Counter(
+    'logos_peticiones', "Peticiones atendidas por vista y clase de estado (2xx, 3xx, ...).", ['vista', 'metodo', 'estado'],
+)
+consultas_por_peticion = Histogram(
+    'logos_consultas_por_peticion', "Consultas SQL por petición.", ['vista'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+sql_segundos = Histogram(
+    'logos_sql_segundos', "Tiempo total en SQL por petición.", ['vista'],
+)
+# uso: pagina (cache_anonimo), fragmento ({% cache %}), sesion, usuario (UsuarioEnCacheBackend)
+# y version_catalogo
+cache_busquedas = Counter(
+    'logos_cache', "Búsquedas en caché por uso y resultado (acierto/fallo).", ['uso', 'resultado'],
+)
+checkout = Counter(
+    'logos_checkout', "Intentos de checkout por resultado.", ['resultado'],
+)
+carrito_cambios = Counter(
+    'logos_carrito_cambios', "Cambios en los carritos (agregar, actualizar, eliminar).", ['accion'],
+)
+busqueda_segundos = Histogram(
+    'logos_busqueda_segundos', "Duración de las búsquedas de la tienda (?q=).",
+)
+
+
+def observar_peticion(request, response, tiempos):
+    # Nombre de la URL, no la ruta: /pedido/<id>/ no debe crear una serie por pedido
+    coincidencia = request.resolver_match
+    vista = coincidencia.view_name if coincidencia else 'sin_ruta'
+    metodo = request.method if request.method in ('GET', 'POST', 'HEAD') else 'otro'
+    peticion_segundos.labels(vista, metodo).observe(tiempos['total'] / 1000)
+    peticiones.labels(vista, metodo, f'{response.status_code // 100}xx').inc()
+    consultas_por_peticion.labels(vista).observe(tiempos['consultas'])
+    sql_segundos.labels(vista).observe(tiempos['db'] / 1000)
+
+
+def registrar_cache(uso, acierto):
+    cache_busquedas.labels(uso, 'acierto' if acierto else 'fallo').inc()
+
+
+@receiver(post_save, sender=Carrito)
+def carrito_guardado(sender, instance, created, **kwargs):
+    carrito_cambios.labels('agregar' if created else 'actualizar').inc()
+
+
+@receiver(post_delete, sender=Carrito)
+def carrito_eliminado(sender, instance, **kwargs):
+    carrito_cambios.labels('eliminar').inc()
+
+
+def exportar():
+    """
+    Devuelve las métricas en el formato de texto de Prometheus: las de
+    todos los procesos si PROMETHEUS_MULTIPROC_DIR está definido, las de
+    este proceso si no.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro)
@@ -0,0 +1,276 @@
+import cProfile
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import metricas, perfilado
+from .prerenderizado import cargar
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él solo se comprime con gzip
+    brotli = None
+
+logger = logging.getLogger('app_logos.rendimiento')
+
+re_acepta_brotli = _lazy_re_compile(r'\bbr\b')
+re_acepta_gzip = _lazy_re_compile(r'\bgzip\b')
+
+# Imágenes, PDF y demás ya vienen comprimidos: volver a comprimirlos solo gasta CPU
+TIPOS_COMPRIMIBLES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+# Calidad baja a propósito: se comprime en cada petición, no una vez como los estáticos
+CALIDAD_BROTLI = 5
+
+
+class CompresionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware con Brotli cuando el navegador lo acepta, un tamaño mínimo
+    configurable (COMPRESION_MINIMO_BYTES) y solo para tipos de texto.
+    Las respuestas en streaming (exportación CSV) se comprimen por partes.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(TIPOS_COMPRIMIBLES):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESION_MINIMO_BYTES:
+            return response
+
+        aceptadas = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or not re_acepta_brotli.search(aceptadas):
+            if response.streaming and response['Content-Type'].startswith('text/event-stream'):
+                # GZipMiddleware retiene lo comprimido hasta juntar un bloque: los eventos no llegarían
+                return response
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            # Los eventos (text/event-stream) deben llegar al cliente en cuanto se emiten;
+            # el resto (exportación CSV) comprime mejor dejando que Brotli junte las filas.
+            vaciar = response['Content-Type'].startswith('text/event-stream')
+            if response.is_async:
+                response.streaming_content = _brotli_async(response.streaming_content, vaciar)
+            else:
+                response.streaming_content = _brotli_secuencia(response.streaming_content, vaciar)
+            del response.headers['Content-Length']
+        else:
+            comprimido = brotli.compress(response.content, quality=CALIDAD_BROTLI)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        # Igual que GZipMiddleware: el ETag fuerte pasa a débil al cambiar los bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+def _brotli_parte(compresor, parte, vaciar):
+    salida = compresor.process(parte)
+    return salida + compresor.flush() if vaciar else salida
+
+
+def _brotli_secuencia(secuencia, vaciar):
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    for parte in secuencia:
+        salida = _brotli_parte(compresor, parte, vaciar)
+        if salida:
+            yield salida
+    yield compresor.finish()
+
+
+async def _brotli_async(secuencia, vaciar):
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    async for parte in secuencia:
+        salida = _brotli_parte(compresor, parte, vaciar)
+        if salida:
+            yield salida
+    yield compresor.finish()
+
+
+class PaginasPrerenderizadasMiddleware:
+    """
+    Sirve desde memoria las páginas generadas con `manage.py prerenderizar_paginas`
+    a los visitantes sin sesión, sin pasar por la vista ni por los procesadores
+    de contexto. Va al final de MIDDLEWARE: así las respuestas reciben las
+    mismas cabeceras de seguridad que el resto (X-Frame-Options, CSRF,
+    Vary), y como la sesión y el usuario se cargan de forma perezosa,
+    servirlas no toca la base de datos.
+
+    Con DEBUG activo no se usa, para que los cambios en plantillas se vean
+    sin volver a generar las páginas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paginas = {} if settings.DEBUG else cargar()
+        if not self.paginas:
+            raise MiddlewareNotUsed
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        response = self.servir(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        response = self.servir(request)
+        return await self.get_response(request) if response is None else response
+
+    def servir(self, request):
+        pagina = self.paginas.get(request.path_info)
+        if (pagina is None or request.method != 'GET'
+                or settings.SESSION_COOKIE_NAME in request.COOKIES
+                or CookieStorage.cookie_name in request.COOKIES):
+            return None
+
+        if pagina['etag'] in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            aceptadas = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            codificacion = ''
+            if 'br' in pagina['variantes'] and re_acepta_brotli.search(aceptadas):
+                codificacion = 'br'
+            elif 'gzip' in pagina['variantes'] and re_acepta_gzip.search(aceptadas):
+                codificacion = 'gzip'
+            response = HttpResponse(pagina['variantes'][codificacion], content_type=pagina['tipo'])
+            if codificacion:
+                response['Content-Encoding'] = codificacion
+        # Débil: el mismo ETag vale para las tres codificaciones
+        response['ETag'] = 'W/' + pagina['etag']
+        patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Mide en qué se va el tiempo de cada petición (SQL, procesadores de
+    contexto, plantillas, la vista y el resto de middlewares) y lo envía en
+    la cabecera Server-Timing, que las herramientas de desarrollo del
+    navegador muestran, en una línea JSON del logger app_logos.rendimiento
+    y en las métricas de Prometheus (app_logos/metricas.py).
+    Va primero en MIDDLEWARE para que 'total' lo incluya todo.
+
+    Un administrador puede añadir ?perfilar=1 (PERFIL_PARAMETRO) a cualquier
+    URL para guardar un perfil de cProfile de esa petición; la cabecera
+    X-Perfil trae la URL para descargarlo.
+
+    Las respuestas en streaming (exportación CSV) se miden hasta que empieza
+    el envío: lo que se consulte durante el recorrido no entra.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        token = perfilado.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            perfilador = getattr(request, '_perfilador', None)
+            if perfilador is not None:
+                perfilador.disable()
+            tiempos = perfilado.terminar(token)
+        return self.completar(request, response, tiempos, perfilador)
+
+    async def __acall__(self, request):
+        token = perfilado.iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perfilador = getattr(request, '_perfilador', None)
+            if perfilador is not None:
+                # cProfile mide un solo hilo: el de process_view, donde también corren
+                # el ORM y las plantillas; hay que desactivarlo desde ese mismo hilo.
+                await sync_to_async(perfilador.disable)()
+            tiempos = perfilado.terminar(token)
+        return self.completar(request, response, tiempos, perfilador)
+
+    def completar(self, request, response, tiempos, perfilador):
+        metricas.observar_peticion(request, response, tiempos)
+
+        response['Server-Timing'] = ', '.join(
+            [f'{fase};dur={tiempos[fase]:.1f};desc="{descripcion}"' for fase, descripcion in perfilado.FASES.items()]
+            + [f'total;dur={tiempos["total"]:.1f}']
+        )
+        if perfilador is not None:
+            perfil_id = perfilado.guardar_perfil(perfilador)
+            response['X-Perfil'] = reverse('descargar_perfil', args=[perfil_id])
+
+        if logger.isEnabledFor(logging.INFO):
+            coincidencia = request.resolver_match
+            logger.info(json.dumps({
+                'metodo': request.method,
+                'ruta': request.path,
+                'vista': coincidencia.view_name if coincidencia else None,
+                'estado': response.status_code,
+                'consultas': tiempos['consultas'],
+                **{f'{fase}_ms': round(tiempos[fase], 1) for fase in (*perfilado.FASES, 'total')},
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Aquí ya pasaron sesión y autenticación: desde ahora, y hasta FinVistaMiddleware, el tiempo es de la vista
+        perfilado.entrar('view')
+        perfilado.marcar_vista(request.resolver_match.view_name)
+        if request.GET.get(settings.PERFIL_PARAMETRO) and request.user.is_staff:
+            request._perfilador = cProfile.Profile()
+            request._perfilador.enable()
+        return None
+
+
+class FinVistaMiddleware:
+    """
+    Cierra la fase 'view' de ServerTimingMiddleware cuando vuelve la
+    respuesta de la vista (ya renderizada), para que lo que hagan después
+    los middlewares de respuesta (compresión, sesión, cookies) cuente como
+    'mw'. Va al final de MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        perfilado.salir_de('view')
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        perfilado.salir_de('view')
+        return response
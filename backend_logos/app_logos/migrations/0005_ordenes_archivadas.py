@@ -0,0 +1,46 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0004_orden_banco_tarjeta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_orden', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('pagado', 'Pagado'), ('enviado', 'Enviado'), ('entregado', 'Entregado'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('direccion_envio', models.TextField()),
+                ('metodo_pago', models.CharField(choices=[('tarjeta', 'Tarjeta de Crédito/Débito')], default='tarjeta', max_length=20)),
+                ('banco_tarjeta', models.CharField(blank=True, max_length=50)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('costo_envio', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ordenes_archivadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Órdenes archivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='DetalleOrdenArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('libro', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app_logos.libro')),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='app_logos.ordenarchivada')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0005_ordenes_archivadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Versión diminuta de la portada como data URI'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0006_libro_imagen_metadatos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-fecha_creacion'], name='libro_activo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['categoria', '-fecha_creacion'], name='libro_activo_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(condition=models.Q(('activo', True), ('destacado', True)), fields=['-fecha_creacion'], name='libro_destacado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['-fecha_creacion'], name='libro_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['cliente', '-fecha_orden'], name='orden_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['estado', '-fecha_orden'], name='orden_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['-fecha_orden'], name='orden_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaLenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(max_length=32, unique=True)),
+                ('sql', models.TextField(help_text='Consulta normalizada')),
+                ('parametros', models.CharField(blank=True, help_text='Tipos de los parámetros, sin sus valores', max_length=200)),
+                ('vista', models.CharField(blank=True, max_length=100)),
+                ('origen', models.CharField(blank=True, help_text='Línea del proyecto que lanzó la consulta', max_length=300)),
+                ('plan', models.TextField(blank=True)),
+                ('veces', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('primera_vez', models.DateTimeField(auto_now_add=True)),
+                ('ultima_vez', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Consultas lentas',
+            },
+        ),
+    ]
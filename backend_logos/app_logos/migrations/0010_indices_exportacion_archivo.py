@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-19 14:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0009_eventos_pedidos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordenarchivada',
+            index=models.Index(fields=['fecha_orden'], name='archivada_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenarchivada',
+            index=models.Index(fields=['estado', 'fecha_orden'], name='archivada_estado_fecha_idx'),
+        ),
+    ]
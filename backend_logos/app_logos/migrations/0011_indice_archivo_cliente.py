@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-19 14:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_logos', '0010_indices_exportacion_archivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordenarchivada',
+            index=models.Index(fields=['cliente', '-fecha_orden'], name='archivada_cliente_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,186 @@
+import base64
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageFilter, ImageOps
+
+from .catalogo import invalidar_catalogo
+from .models import Libro
+
+logger = logging.getLogger('app_logos.miniaturas')
+
+# Anchos generados para cada portada: 120 px cubre las miniaturas de mis_pedidos
+# (60 px en pantallas 2x), 240 y 480 px las tarjetas de inicio y tienda.
+ANCHOS = (120, 240, 480)
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+# Ancho del marcador borroso que se incrusta en el HTML mientras carga la portada
+ANCHO_PLACEHOLDER = 12
+
+
+def nombre_variante(nombre, ancho, formato):
+    """
+    Nombre (relativo a MEDIA_ROOT) de una variante, junto al original:
+    libros/portada.jpeg -> libros/portada.240w.webp
+    """
+    base, _ = os.path.splitext(nombre)
+    return f"{base}.{ancho}w.{formato}"
+
+
+def _ruta(nombre):
+    return os.path.join(settings.MEDIA_ROOT, nombre)
+
+
+def generar_variantes(nombre, forzar=False):
+    """
+    Genera todas las variantes de una portada y calcula sus metadatos.
+    Trabaja solo con rutas del sistema de archivos y Pillow, así que puede
+    ejecutarse en otro proceso.
+
+    Devuelve un diccionario con 'escritos' (archivos generados), 'ancho' y
+    'alto' del original y 'placeholder' (data URI), o None si el original
+    no existe.
+    """
+    origen = _ruta(nombre)
+    if not os.path.exists(origen):
+        return None
+
+    escritos = 0
+    with Image.open(origen) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        for ancho in ANCHOS:
+            copia = None
+            for formato, opciones in FORMATOS.items():
+                destino = _ruta(nombre_variante(nombre, ancho, formato))
+                if not forzar and os.path.exists(destino):
+                    continue
+                if copia is None:
+                    # thumbnail() nunca amplía: si el original es más angosto se conserva su tamaño
+                    copia = imagen.copy()
+                    copia.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+                salida = copia
+                if opciones['format'] == 'JPEG' and salida.mode not in ('RGB', 'L'):
+                    salida = _sin_transparencia(salida)
+                elif salida.mode not in ('RGB', 'RGBA', 'L'):
+                    salida = salida.convert('RGBA')
+                temporal = f"{destino}.tmp"
+                salida.save(temporal, **opciones)
+                os.replace(temporal, destino)
+                escritos += 1
+
+        return {
+            'escritos': escritos,
+            'ancho': imagen.width,
+            'alto': imagen.height,
+            'placeholder': _placeholder(imagen),
+        }
+
+
+def _sin_transparencia(imagen):
+    imagen = imagen.convert('RGBA')
+    fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+    fondo.paste(imagen, mask=imagen.getchannel('A'))
+    return fondo
+
+
+def _placeholder(imagen):
+    diminuta = imagen.copy()
+    diminuta.thumbnail((ANCHO_PLACEHOLDER, ANCHO_PLACEHOLDER * 4))
+    if diminuta.mode not in ('RGB', 'L'):
+        diminuta = _sin_transparencia(diminuta)
+    diminuta = diminuta.filter(ImageFilter.GaussianBlur(1))
+    # WebP: sin las tablas de cuantización de JPEG el data URI queda en unas decenas de bytes
+    buffer = io.BytesIO()
+    diminuta.save(buffer, format='WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def variantes_existen(nombre):
+    return all(
+        os.path.exists(_ruta(nombre_variante(nombre, ancho, formato)))
+        for ancho in ANCHOS for formato in FORMATOS
+    )
+
+
+def _procesar(argumentos):
+    nombre, forzar = argumentos
+    return nombre, generar_variantes(nombre, forzar)
+
+
+def generar_variantes_masivo(nombres, procesos=None, forzar=False):
+    """
+    Genera las variantes de muchas portadas en un pool de procesos, para que
+    la codificación de imágenes no se haga de una en una. Produce pares
+    (nombre, resultado de generar_variantes) conforme se terminan.
+    """
+    nombres = list(dict.fromkeys(nombres))
+    if not nombres:
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        yield from pool.map(_procesar, [(nombre, forzar) for nombre in nombres], chunksize=16)
+
+
+def guardar_metadatos(nombre, resultado):
+    # update() en lugar de save() para no volver a disparar post_save
+    Libro.objects.filter(imagen=nombre).update(
+        imagen_ancho=resultado['ancho'],
+        imagen_alto=resultado['alto'],
+        imagen_placeholder=resultado['placeholder'],
+    )
+
+
+# Un solo hilo: codificar portadas no debe ocupar el hilo de una petición ni competir
+# con ellas por todos los núcleos. _encoladas evita encolar dos veces la misma portada.
+_cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix='miniaturas')
+_encoladas = set()
+_candado = threading.Lock()
+
+
+def encolar(nombre):
+    """
+    Programa la generación de las variantes y metadatos de una portada en
+    segundo plano. Con MINIATURAS_EN_SEGUNDO_PLANO desactivado no hace nada
+    y quedan para `manage.py generar_miniaturas`.
+    """
+    if not settings.MINIATURAS_EN_SEGUNDO_PLANO:
+        return
+    with _candado:
+        if nombre in _encoladas:
+            return
+        _encoladas.add(nombre)
+    _cola.submit(_generar_encolada, nombre)
+
+
+def _generar_encolada(nombre):
+    try:
+        resultado = generar_variantes(nombre)
+        if resultado:
+            guardar_metadatos(nombre, resultado)
+            # Dimensiones y marcador nuevos en las tarjetas que están en caché
+            invalidar_catalogo()
+    except (OSError, DatabaseError):
+        logger.exception("No se pudieron generar las variantes de %s", nombre)
+    finally:
+        with _candado:
+            _encoladas.discard(nombre)
+        # El hilo no pasa por request_finished: sus conexiones se cierran aquí
+        connections.close_all()
+
+
+@receiver(post_save, sender=Libro)
+def portada_guardada(sender, instance, raw=False, **kwargs):
+    # Una portada subida desde el CRUD o el admin se procesa en segundo plano una vez confirmado el guardado
+    if raw or not instance.imagen:
+        return
+    if not instance.imagen_placeholder or not variantes_existen(instance.imagen.name):
+        nombre = instance.imagen.name
+        transaction.on_commit(lambda: encolar(nombre))
@@ -1,5 +1,6 @@
 
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.db.models.signals import post_save
@@ -48,6 +49,10 @@ class Libro(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=1)
     imagen = models.ImageField(upload_to='libros/', default='libros/default.png', help_text="Imagen de portada del libro")
+    # Calculados al subir la portada (ver miniaturas.py); se usan para reservar espacio y mostrar un marcador borroso
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_placeholder = models.TextField(blank=True, editable=False, help_text="Versión diminuta de la portada como data URI")
     activo = models.BooleanField(default=True, help_text="Indica si el libro está disponible en la tienda")
     destacado = models.BooleanField(default=False, help_text="Marcar para que aparezca en la página de inicio")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -55,6 +60,34 @@ class Libro(models.Model):
     def __str__(self):
         return self.titulo
 
+    @property
+    def miniaturas(self):
+        """
+        URLs de las variantes reducidas de la portada, por formato y ancho:
+        {'webp': {120: url, 240: url, 480: url}, 'jpg': {...}}
+        """
+        from .miniaturas import ANCHOS, FORMATOS, nombre_variante
+        if not self.imagen:
+            return {}
+        storage = self.imagen.storage
+        return {
+            formato: {ancho: storage.url(nombre_variante(self.imagen.name, ancho, formato)) for ancho in ANCHOS}
+            for formato in FORMATOS
+        }
+
+    class Meta:
+        indexes = [
+            # Tienda e inicio solo muestran libros activos: índices parciales, más chicos
+            # y que ya vienen en el orden de la página (más recientes primero)
+            models.Index(fields=['-fecha_creacion'], condition=Q(activo=True), name='libro_activo_fecha_idx'),
+            models.Index(fields=['categoria', '-fecha_creacion'], condition=Q(activo=True), name='libro_activo_categoria_idx'),
+            # Django filtra los booleanos como "activo AND destacado", sin "= 1": la columna
+            # no serviría como clave del índice, así que va en la condición
+            models.Index(fields=['-fecha_creacion'], condition=Q(activo=True, destacado=True), name='libro_destacado_idx'),
+            # Listado de productos del panel (incluye inactivos)
+            models.Index(fields=['-fecha_creacion'], name='libro_fecha_idx'),
+        ]
+
 # Modelo de Perfil de Usuario, complementa el modelo User de Django para representar 'Clientes'
 class PerfilUsuario(models.Model):
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil')
@@ -113,6 +146,16 @@ class Orden(models.Model):
     def __str__(self):
         return f"Orden #{self.id} de {self.cliente.username}"
 
+    class Meta:
+        indexes = [
+            # mis_pedidos y detalle_pedido
+            models.Index(fields=['cliente', '-fecha_orden'], name='orden_cliente_fecha_idx'),
+            # Filtro por estado del admin y de la exportación; archivar_pedidos
+            models.Index(fields=['estado', '-fecha_orden'], name='orden_estado_fecha_idx'),
+            # Listado general y rangos de fechas de la exportación
+            models.Index(fields=['-fecha_orden'], name='orden_fecha_idx'),
+        ]
+
 # Modelo para los Detalles de la Orden, corresponde a la tabla 'Detallesorden' (antes 'ItemPedido')
 class DetalleOrden(models.Model):
     orden = models.ForeignKey(Orden, on_delete=models.CASCADE, related_name='detalles')
@@ -123,3 +166,81 @@ class DetalleOrden(models.Model):
 
     def __str__(self):
         return f"{self.cantidad} x {self.libro.titulo}"
+
+# Archivo frío de órdenes: las órdenes entregadas o canceladas con cierta antigüedad
+# se mueven aquí (comando `archivar_pedidos`) para que las tablas activas se mantengan pequeñas.
+# Se conserva el mismo id para que las URLs de detalle_pedido sigan funcionando.
+class OrdenArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    cliente = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='ordenes_archivadas')
+    fecha_orden = models.DateTimeField()
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    estado = models.CharField(max_length=20, choices=Orden.ESTADO_CHOICES)
+    direccion_envio = models.TextField()
+    metodo_pago = models.CharField(max_length=20, choices=Orden.METODO_PAGO_CHOICES, default='tarjeta')
+    banco_tarjeta = models.CharField(max_length=50, blank=True)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    costo_envio = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Orden archivada #{self.id}"
+
+    class Meta:
+        verbose_name_plural = "Órdenes archivadas"
+        indexes = [
+            # Exportación por rango de fechas y por estado
+            models.Index(fields=['fecha_orden'], name='archivada_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_orden'], name='archivada_estado_fecha_idx'),
+            # Pedidos anteriores en mis_pedidos
+            models.Index(fields=['cliente', '-fecha_orden'], name='archivada_cliente_fecha_idx'),
+        ]
+
+class DetalleOrdenArchivado(models.Model):
+    orden = models.ForeignKey(OrdenArchivada, on_delete=models.CASCADE, related_name='detalles')
+    libro = models.ForeignKey(Libro, on_delete=models.PROTECT, related_name='+')
+    cantidad = models.PositiveIntegerField()
+    precio_unidad = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.libro.titulo}"
+
+# Cambios de estado de las órdenes, para avisar a sus clientes por SSE (app_logos/notificaciones.py).
+# Cada proceso los lee en lote; se borran pasados NOTIFICACIONES_RETENCION_SEGUNDOS, el tiempo que
+# un navegador desconectado tiene para recuperarlos al volver (cabecera Last-Event-ID).
+class EventoPedido(models.Model):
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='eventos_pedidos')
+    orden = models.ForeignKey(Orden, on_delete=models.CASCADE, related_name='eventos')
+    estado = models.CharField(max_length=20, choices=Orden.ESTADO_CHOICES)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Orden #{self.orden_id}: {self.estado}"
+
+    class Meta:
+        indexes = [
+            # Limpieza de los eventos vencidos
+            models.Index(fields=['fecha'], name='evento_pedido_fecha_idx'),
+        ]
+
+# Consultas que tardaron más de CONSULTAS_LENTAS_MS, agrupadas por huella (la consulta
+# con los valores reemplazados por ?). Las registra app_logos/consultas_lentas.py.
+class ConsultaLenta(models.Model):
+    huella = models.CharField(max_length=32, unique=True)
+    sql = models.TextField(help_text="Consulta normalizada")
+    parametros = models.CharField(max_length=200, blank=True, help_text="Tipos de los parámetros, sin sus valores")
+    vista = models.CharField(max_length=100, blank=True)
+    origen = models.CharField(max_length=300, blank=True, help_text="Línea del proyecto que lanzó la consulta")
+    plan = models.TextField(blank=True)
+    veces = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    primera_vez = models.DateTimeField(auto_now_add=True)
+    ultima_vez = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.huella} ({self.veces} veces)"
+
+    class Meta:
+        verbose_name_plural = "Consultas lentas"
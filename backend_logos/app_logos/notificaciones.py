@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import EventoPedido, Orden
+
+logger = logging.getLogger('app_logos.notificaciones')
+
+ESTADOS = dict(Orden.ESTADO_CHOICES)
+
+# Eventos que se leen como máximo en cada consulta; el resto llega en la siguiente
+LOTE = 500
+
+
+def publicar(ordenes):
+    """
+    Registra el estado actual de las órdenes para avisar a sus clientes.
+    Se llama después de cambiarlo, con una orden (cambiar_estado_pedido) o
+    con muchas (cambiar_estado_pedidos). Dentro de una transacción los
+    eventos solo se ven al confirmarla, igual que el cambio de estado.
+    """
+    EventoPedido.objects.bulk_create([
+        EventoPedido(usuario_id=orden.cliente_id, orden_id=orden.id, estado=orden.estado)
+        for orden in ordenes if orden.cliente_id
+    ])
+    limite = timezone.now() - timedelta(seconds=settings.NOTIFICACIONES_RETENCION_SEGUNDOS)
+    EventoPedido.objects.filter(fecha__lt=limite).delete()
+
+
+async def ultimo_id():
+    return (await EventoPedido.objects.aaggregate(ultimo=Max('id')))['ultimo'] or 0
+
+
+async def punto_de_partida(visto):
+    """
+    Evento desde el que sigue una conexión: el último de la tabla si el
+    navegador no trae Last-Event-ID. El suyo se acota a los eventos
+    retenidos, porque el difusor lee desde el menor de todas las conexiones:
+    un 0 o un id anterior a la limpieza haría esperar a todos mientras
+    recorre por lotes eventos que ya no le sirven a nadie.
+    """
+    ultimo = await ultimo_id()
+    if visto is None:
+        return ultimo
+    # Dos consultas en vez de un aggregate con Min y Max: SQLite solo resuelve
+    # cada extremo por el índice si va solo
+    primero = await EventoPedido.objects.order_by('id').values_list('id', flat=True).afirst()
+    return min(max(visto, (primero or 1) - 1), ultimo)
+
+
+async def pendientes(usuario_id, desde):
+    eventos = EventoPedido.objects.filter(usuario_id=usuario_id, id__gt=desde).order_by('id')
+    return [evento async for evento in eventos.values('id', 'orden_id', 'estado')[:LOTE]]
+
+
+def mensaje(eventos):
+    """
+    Un solo mensaje SSE con los cambios del lote; si una orden cambió
+    varias veces, solo cuenta el último estado.
+    """
+    ultimos = {evento['orden_id']: evento['estado'] for evento in eventos}
+    datos = [
+        {'pedido': orden_id, 'estado': estado, 'estado_display': ESTADOS.get(estado, estado)}
+        for orden_id, estado in ultimos.items()
+    ]
+    return f"id: {eventos[-1]['id']}\nevent: pedidos\ndata: {json.dumps(datos)}\n\n"
+
+
+def encabezado(desde):
+    # El id vacío de datos actualiza Last-Event-ID en el navegador sin disparar un evento
+    return f"retry: {settings.NOTIFICACIONES_REINTENTO_MS}\nid: {desde}\n\n"
+
+
+class Suscripcion:
+    def __init__(self, usuario_id, desde):
+        self.usuario_id = usuario_id
+        self.desde = desde
+        self.cola = asyncio.Queue()
+
+
+class Difusor:
+    """
+    Reparte los EventoPedido nuevos entre las conexiones abiertas de este
+    proceso. Una sola tarea consulta la tabla cada NOTIFICACIONES_INTERVALO
+    segundos, sin importar cuántos clientes haya conectados, y entrega a
+    cada uno los cambios de sus órdenes en un solo lote.
+
+    Cada suscripción recuerda el último evento que ya vio: la consulta
+    parte del menor, así que quien se reconecta con Last-Event-ID recibe
+    en la siguiente vuelta lo que se perdió. La tarea termina cuando no
+    queda nadie conectado.
+
+    Las lecturas corren con sync_to_async en un hilo propio (la tarea no
+    hereda el contexto de ninguna petición), y como ahí no llega
+    request_finished, la conexión se cierra después de cada vuelta igual
+    que al terminar una petición, respetando CONN_MAX_AGE.
+    """
+
+    def __init__(self):
+        self.suscripciones = set()
+        self.tarea = None
+
+    def suscribir(self, usuario_id, desde):
+        suscripcion = Suscripcion(usuario_id, desde)
+        self.suscripciones.add(suscripcion)
+        if self.tarea is None or self.tarea.done():
+            # En un contexto vacío: la tarea sobrevive a la petición que la crea y no
+            # debe heredar su medición (perfilado) ni el hilo de su sync_to_async.
+            self.tarea = contextvars.Context().run(asyncio.create_task, self.sondear())
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        self.suscripciones.discard(suscripcion)
+
+    async def sondear(self):
+        while self.suscripciones:
+            await asyncio.sleep(settings.NOTIFICACIONES_INTERVALO)
+            try:
+                await self.repartir()
+            except DatabaseError:
+                logger.exception("No se pudieron leer los eventos de pedidos")
+            finally:
+                await sync_to_async(close_old_connections)()
+
+    @staticmethod
+    def leer(desde):
+        eventos = EventoPedido.objects.filter(id__gt=desde).order_by('id')
+        return list(eventos.values('id', 'usuario_id', 'orden_id', 'estado')[:LOTE])
+
+    async def repartir(self):
+        suscripciones = list(self.suscripciones)
+        if not suscripciones:
+            return
+        desde = min(suscripcion.desde for suscripcion in suscripciones)
+        eventos = await sync_to_async(self.leer)(desde)
+        if not eventos:
+            return
+
+        por_usuario = defaultdict(list)
+        for evento in eventos:
+            por_usuario[evento['usuario_id']].append(evento)
+        hasta = eventos[-1]['id']
+        for suscripcion in suscripciones:
+            nuevos = [evento for evento in por_usuario.get(suscripcion.usuario_id, ()) if evento['id'] > suscripcion.desde]
+            if nuevos:
+                suscripcion.cola.put_nowait(nuevos)
+            # Todo lo anterior a `hasta` ya se revisó para todos
+            suscripcion.desde = max(suscripcion.desde, hasta)
+
+
+difusor = Difusor()
+
+
+async def flujo(usuario_id, desde):
+    """
+    Eventos SSE de una conexión abierta (ASGI). Un comentario cada
+    NOTIFICACIONES_LATIDO_SEGUNDOS mantiene viva la conexión a través de
+    proxies; al desconectarse el cliente Django cancela el recorrido.
+    """
+    suscripcion = difusor.suscribir(usuario_id, desde)
+    try:
+        yield encabezado(desde)
+        while True:
+            try:
+                eventos = await asyncio.wait_for(suscripcion.cola.get(), settings.NOTIFICACIONES_LATIDO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ": latido\n\n"
+                continue
+            yield mensaje(eventos)
+    finally:
+        difusor.cancelar(suscripcion)
@@ -0,0 +1,57 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Por debajo de este número de filas se cuenta con COUNT(*) normal
+UMBRAL_ESTIMACION = 10000
+
+
+def estimar_filas(modelo, using='default'):
+    """
+    Devuelve un número aproximado de filas de la tabla del modelo sin
+    recorrerla, o None si el motor no permite estimarlo de forma barata.
+    """
+    connection = connections[using]
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # MAX() sobre la llave primaria se resuelve con el índice; ignora los huecos de filas borradas
+            cursor.execute(f'SELECT MAX({connection.ops.quote_name(modelo._meta.pk.column)}) FROM {tabla}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [modelo._meta.db_table])
+        else:
+            return None
+        fila = cursor.fetchone()
+    return int(fila[0]) if fila and fila[0] is not None else 0
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """
+    Paginador para listados del admin sobre tablas grandes. Sin filtros
+    usa una estimación del tamaño de la tabla; con filtros cuenta como
+    máximo UMBRAL_ESTIMACION filas más allá de la página pedida, así que
+    el total nunca cuesta un recorrido completo y desde cualquier página
+    se puede seguir avanzando. Si el conteo se cortó, `truncado` es True
+    y la plantilla muestra el total como "N+".
+    """
+
+    def __init__(self, *args, pagina=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            self.pagina = max(int(pagina), 1)
+        except (TypeError, ValueError):
+            self.pagina = 1
+        self.truncado = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimado = estimar_filas(queryset.model, queryset.db)
+            if estimado is not None and estimado > UMBRAL_ESTIMACION:
+                return estimado
+        limite = self.pagina * self.per_page + UMBRAL_ESTIMACION
+        # Una fila de más basta para saber si hay otras después del límite
+        total = queryset[:limite + 1].count()
+        self.truncado = total > limite
+        return min(total, limite)
@@ -0,0 +1,160 @@
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Fases de Server-Timing y su descripción en la cabecera (solo ASCII)
+FASES = {
+    'db': 'SQL',
+    'ctx': 'Procesadores de contexto',
+    'tpl': 'Plantillas',
+    'view': 'Vista',
+    'mw': 'Middleware',
+}
+
+# Medición de la petición actual, o None fuera de ServerTimingMiddleware
+_medicion = ContextVar('medicion', default=None)
+
+
+def iniciar():
+    """
+    Empieza a medir la petición actual. Devuelve el token para terminar().
+    Todo el tiempo cuenta para 'mw' salvo entre process_view, que entra en
+    'view', y FinVistaMiddleware, que sale al volver la respuesta.
+    """
+    medicion = {
+        'tiempos': dict.fromkeys(FASES, 0.0),
+        'pila': ['mw'],
+        'marca': time.perf_counter(),
+        'inicio': time.perf_counter(),
+        'consultas': 0,
+        'vista': None,
+    }
+    return _medicion.set(medicion)
+
+
+def terminar(token):
+    """
+    Cierra la medición y devuelve {fase: milisegundos} más 'total' y 'consultas'.
+    """
+    medicion = _medicion.get()
+    _medicion.reset(token)
+    _acumular(medicion)
+    resultado = {fase: segundos * 1000 for fase, segundos in medicion['tiempos'].items()}
+    resultado['total'] = (time.perf_counter() - medicion['inicio']) * 1000
+    resultado['consultas'] = medicion['consultas']
+    return resultado
+
+
+def _acumular(medicion):
+    ahora = time.perf_counter()
+    medicion['tiempos'][medicion['pila'][-1]] += ahora - medicion['marca']
+    medicion['marca'] = ahora
+
+
+def marcar_vista(nombre):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion['vista'] = nombre
+
+
+def en_peticion():
+    """True si hay una petición medida en curso (dentro de ServerTimingMiddleware)."""
+    return _medicion.get() is not None
+
+
+def vista_actual():
+    """Nombre de URL de la vista que atiende la petición actual, si se conoce."""
+    medicion = _medicion.get()
+    return medicion['vista'] if medicion is not None else None
+
+
+def entrar(fase):
+    medicion = _medicion.get()
+    if medicion is not None:
+        _acumular(medicion)
+        medicion['pila'].append(fase)
+
+
+def salir():
+    medicion = _medicion.get()
+    if medicion is not None:
+        _acumular(medicion)
+        medicion['pila'].pop()
+
+
+def salir_de(fase):
+    """
+    Sale de la fase si es la actual. Sin efecto si nunca se entró, por
+    ejemplo en un 404 que no llegó a process_view.
+    """
+    medicion = _medicion.get()
+    if medicion is not None and medicion['pila'][-1] == fase:
+        salir()
+
+
+@contextmanager
+def fase(nombre):
+    """
+    Cuenta el bloque para la fase indicada. Los tiempos son exclusivos: una
+    consulta lanzada desde una plantilla suma a 'db' y no a 'tpl'.
+    """
+    entrar(nombre)
+    try:
+        yield
+    finally:
+        salir()
+
+
+def medir_sql(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    medicion['consultas'] += 1
+    with fase('db'):
+        return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def instalar_medicion_sql(sender, connection, **kwargs):
+    # Cada conexión (primario y réplicas, en cualquier hilo) lleva el contador; fuera
+    # de una petición medida solo cuesta una lectura de ContextVar por consulta.
+    if medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_sql)
+
+
+def medir_procesador(procesador):
+    def medido(request):
+        with fase('ctx'):
+            return procesador(request)
+    return medido
+
+
+# ========== PERFILES BAJO DEMANDA ==========
+
+def ruta_perfil(perfil_id):
+    return os.path.join(settings.PERFILES_DIR, f"{perfil_id}.prof")
+
+
+def guardar_perfil(perfilador):
+    """
+    Guarda las estadísticas de cProfile (formato pstats, se abren con
+    snakeviz o `python -m pstats`) y borra las más viejas por encima de
+    PERFILES_MAXIMO. Devuelve el id para descargar_perfil.
+    """
+    os.makedirs(settings.PERFILES_DIR, exist_ok=True)
+    perfil_id = uuid.uuid4()
+    perfilador.dump_stats(ruta_perfil(perfil_id))
+
+    archivos = sorted(
+        (entrada for entrada in os.scandir(settings.PERFILES_DIR) if entrada.name.endswith('.prof')),
+        key=lambda entrada: entrada.stat().st_mtime,
+    )
+    for entrada in archivos[:-settings.PERFILES_MAXIMO]:
+        os.remove(entrada.path)
+    return perfil_id
@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .cache_paginas import TOKEN_CSRF
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él solo se generan las variantes .gz
+    brotli = None
+
+MANIFIESTO = 'paginas.json'
+
+
+def renderizar(nombre):
+    """
+    Renderiza la versión anónima de la página con ese nombre de URL, igual que
+    la guardaría cache_anonimo: sin token CSRF y con el script que pide a
+    estado_sesion lo que depende del visitante.
+    """
+    ruta = reverse(nombre)
+    request = RequestFactory().get(ruta)
+    request.user = AnonymousUser()
+    request.cache_anonima = True
+    response = resolve(ruta).func(request)
+    if response.status_code != 200:
+        raise ValueError(f"{ruta} respondió {response.status_code}")
+    return ruta, TOKEN_CSRF.sub(rb'\1\2', response.content), response['Content-Type']
+
+
+def guardar(nombres, directorio=None):
+    """
+    Escribe cada página (más sus variantes .gz y .br) en el directorio y un
+    manifiesto ruta -> archivo que lee PaginasPrerenderizadasMiddleware.
+    """
+    directorio = directorio or settings.PAGINAS_PRERENDERIZADAS_DIR
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = {}
+    for nombre in nombres:
+        ruta, contenido, tipo = renderizar(nombre)
+        archivo = f"{nombre}.html"
+        variantes = {archivo: contenido, f"{archivo}.gz": gzip.compress(contenido, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variantes[f"{archivo}.br"] = brotli.compress(contenido, quality=11)
+        for destino, datos in variantes.items():
+            temporal = os.path.join(directorio, f"{destino}.tmp")
+            with open(temporal, 'wb') as salida:
+                salida.write(datos)
+            os.replace(temporal, os.path.join(directorio, destino))
+        manifiesto[ruta] = {'archivo': archivo, 'tipo': tipo}
+
+    with open(os.path.join(directorio, MANIFIESTO), 'w', encoding='utf-8') as salida:
+        json.dump(manifiesto, salida, indent=2)
+    return manifiesto
+
+
+def cargar(directorio=None):
+    """
+    Lee en memoria las páginas del manifiesto: {ruta: {'tipo', 'etag',
+    'variantes': {codificación: bytes}}}, con '' para la versión sin comprimir.
+    """
+    directorio = directorio or settings.PAGINAS_PRERENDERIZADAS_DIR
+    try:
+        with open(os.path.join(directorio, MANIFIESTO), encoding='utf-8') as entrada:
+            manifiesto = json.load(entrada)
+    except FileNotFoundError:
+        return {}
+
+    paginas = {}
+    for ruta, datos in manifiesto.items():
+        variantes = {}
+        for extension, codificacion in (('', ''), ('.gz', 'gzip'), ('.br', 'br')):
+            try:
+                with open(os.path.join(directorio, datos['archivo'] + extension), 'rb') as entrada:
+                    variantes[codificacion] = entrada.read()
+            except FileNotFoundError:
+                continue
+        if '' in variantes:
+            paginas[ruta] = {
+                'tipo': datos['tipo'],
+                'etag': '"%s"' % hashlib.md5(variantes['']).hexdigest(),
+                'variantes': variantes,
+            }
+    return paginas
@@ -0,0 +1,114 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Modelos que se pueden leer de una réplica: el catálogo tolera unos segundos de retraso
+MODELOS_REPLICABLES = {'libro', 'autor', 'categoria'}
+
+# True cuando la petición actual ya escribió algo
+_escribio = ContextVar('escribio', default=False)
+# True cuando la petición llega dentro de la ventana posterior a una escritura
+_ventana = ContextVar('ventana', default=False)
+
+COOKIE_PRIMARIO = 'primario_hasta'
+
+
+def fijar_primario():
+    _escribio.set(True)
+
+
+def leer_del_primario():
+    return _escribio.get() or _ventana.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    """
+    Envía las lecturas del catálogo (Libro, Autor, Categoria) a una réplica
+    al azar de settings.DATABASE_REPLICAS; todo lo demás, y todas las
+    escrituras, al primario.
+
+    Se lee del primario (para ver lo que uno mismo acaba de escribir):
+    - dentro de una transacción,
+    - en el resto de una petición que ya escribió,
+    - durante REPLICA_PRIMARIO_SEGUNDOS tras una escritura, en las peticiones
+      siguientes del mismo navegador (PrimarioStickyMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'app_logos' or model._meta.model_name not in MODELOS_REPLICABLES:
+            return DEFAULT_DB_ALIAS
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            # Los objetos relacionados se leen de la misma base que el que los referencia
+            return instancia._state.db
+        if not settings.DATABASE_REPLICAS or leer_del_primario():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        fijar_primario()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in bases and obj2._state.db in bases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas son copias del primario (manage.py sincronizar_replicas)
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimarioStickyMiddleware:
+    """
+    Mantiene en el primario a quien acaba de escribir: una escritura en la
+    petición deja una cookie con la hora hasta la que sus lecturas no deben
+    ir a una réplica (p. ej. el pedido que se muestra justo después del checkout).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        tokens = self.entrar(request)
+        try:
+            return self.salir(self.get_response(request))
+        finally:
+            self.restaurar(tokens)
+
+    async def __acall__(self, request):
+        # Las consultas de las vistas async corren en otro hilo, pero sync_to_async
+        # devuelve al bucle los ContextVar que cambian allí (_escribio incluido).
+        tokens = self.entrar(request)
+        try:
+            return self.salir(await self.get_response(request))
+        finally:
+            self.restaurar(tokens)
+
+    def entrar(self, request):
+        try:
+            hasta = float(request.COOKIES.get(COOKIE_PRIMARIO, 0))
+        except ValueError:
+            hasta = 0
+        return _escribio.set(False), _ventana.set(hasta > time.time())
+
+    def salir(self, response):
+        if _escribio.get():
+            segundos = settings.REPLICA_PRIMARIO_SEGUNDOS
+            response.set_cookie(COOKIE_PRIMARIO, str(time.time() + segundos), max_age=segundos, httponly=True, samesite='Lax')
+        return response
+
+    def restaurar(self, tokens):
+        _escribio.reset(tokens[0])
+        _ventana.reset(tokens[1])
@@ -0,0 +1,22 @@
+from django.contrib.sessions.backends import cached_db
+
+from .metricas import registrar_cache
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Sesiones cached_db que cuentan aciertos y fallos en logos_cache (uso
+    'sesion'). Misma clave de caché y misma tabla que cached_db, así que
+    las sesiones abiertas siguen valiendo al cambiar de motor.
+    """
+
+    def load(self):
+        self._leida_de_bd = False
+        datos = super().load()
+        registrar_cache('sesion', not self._leida_de_bd)
+        return datos
+
+    def _get_session_from_db(self):
+        # cached_db solo va a la base de datos cuando la sesión no está en caché
+        self._leida_de_bd = True
+        return super()._get_session_from_db()
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import os
+import re
+from contextvars import ContextVar
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él solo se generan las variantes .gz
+    brotli = None
+
+# Nombre de archivo generado por AlmacenamientoPorContenido (o una de sus miniaturas)
+NOMBRE_POR_CONTENIDO = re.compile(r'^[0-9a-f]{32}(\.\d+w)?\.[a-z0-9]+$')
+LONGITUD_HASH = 32
+# True mientras AlmacenamientoPorContenido escribe un archivo (ver get_available_name)
+_guardando = ContextVar('almacenamiento_guardando', default=False)
+
+
+def hash_contenido(archivo):
+    sha = hashlib.sha256()
+    for bloque in archivo.chunks() if hasattr(archivo, 'chunks') else iter(lambda: archivo.read(65536), b''):
+        sha.update(bloque)
+    return sha.hexdigest()[:LONGITUD_HASH]
+
+
+def nombre_por_contenido(nombre, digest):
+    directorio = os.path.dirname(nombre)
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension == '.jpeg':
+        extension = '.jpg'
+    return os.path.join(directorio, f"{digest}{extension}")
+
+
+def es_nombre_por_contenido(nombre):
+    return bool(NOMBRE_POR_CONTENIDO.match(os.path.basename(nombre)))
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """
+    Guarda cada archivo con el hash de su contenido como nombre
+    (libros/3f9a...c1.jpg). Subir dos veces la misma portada reutiliza el
+    archivo existente, y como una URL nunca cambia de contenido se puede
+    servir con caché de un año.
+    """
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        nombre = nombre_por_contenido(name, hash_contenido(content))
+        if self.exists(nombre):
+            return nombre
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        token = _guardando.set(True)
+        try:
+            return super()._save(nombre, content)
+        except FileExistsError:
+            # Otra subida del mismo contenido lo escribió entre exists() y ahora:
+            # ese archivo es, por su nombre, idéntico a este
+            if not os.path.isfile(self.path(nombre)):
+                raise
+            return nombre
+        finally:
+            _guardando.reset(token)
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo se decide en _save() a partir del contenido. Si
+        # FileSystemStorage._save lo encuentra ya creado pide otro nombre aquí:
+        # reintentar con el mismo sería un bucle infinito, así que se avisa a _save().
+        if _guardando.get():
+            raise FileExistsError(name)
+        return name
+
+
+# Extensiones de estáticos que vale la pena precomprimir
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.map')
+TAMANO_MINIMO_COMPRESION = 512
+
+
+# Cadenas y url() sin comillas se copian tal cual (pueden llevar espacios, ';' o '/*');
+# los comentarios se quitan
+_PARTES_CSS = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|url\([^)"']*\))|/\*.*?\*/''', re.S | re.I)
+
+
+def _minificar_tramo(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}')
+
+
+def minificar_css(css):
+    """
+    Minificación conservadora: quita comentarios y espacios redundantes sin
+    tocar el contenido de las reglas (calc(), selectores con ':' o cadenas).
+    """
+    partes, tramo, posicion = [], [], 0
+    for coincidencia in _PARTES_CSS.finditer(css):
+        tramo.append(css[posicion:coincidencia.start()])
+        posicion = coincidencia.end()
+        if coincidencia.group(1):
+            partes += [_minificar_tramo(''.join(tramo)), coincidencia.group(1)]
+            tramo = []
+    tramo.append(css[posicion:])
+    partes.append(_minificar_tramo(''.join(tramo)))
+    return ''.join(partes).strip()
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """
+    Estáticos para producción: nombres con hash del contenido (caché de un
+    año), CSS minificado y variantes .gz/.br de cada archivo hasheado para
+    que el servidor web las entregue sin comprimir en cada petición.
+    """
+
+    def _save(self, name, content):
+        if name.endswith('.css'):
+            content.seek(0)
+            content = ContentFile(minificar_css(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = set()
+        for original, hasheado, procesado in super().post_process(paths, dry_run, **options):
+            if hasheado and not isinstance(procesado, Exception):
+                procesados.add(hasheado)
+            yield original, hasheado, procesado
+        if dry_run:
+            return
+        for nombre in procesados:
+            if nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+                self._precomprimir(nombre)
+
+    def _precomprimir(self, nombre):
+        with self.open(nombre) as archivo:
+            datos = archivo.read()
+        if len(datos) < TAMANO_MINIMO_COMPRESION:
+            return
+        variantes = [('.gz', gzip.compress(datos, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append(('.br', brotli.compress(datos, quality=11)))
+        for extension, comprimido in variantes:
+            if len(comprimido) >= len(datos):
+                continue
+            destino = nombre + extension
+            if self.exists(destino):
+                self.delete(destino)
+            FileSystemStorage._save(self, destino, ContentFile(comprimido))
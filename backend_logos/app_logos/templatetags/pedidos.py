@@ -0,0 +1,29 @@
+from django import template
+from django.utils.html import format_html, json_script
+
+register = template.Library()
+
+# Clase CSS e icono de cada estado de Orden. Es la única tabla: la usa el render
+# de mis_pedidos y, vía insignias_estado, el script que aplica los avisos en vivo.
+INSIGNIAS = {
+    'pendiente': ('pending', 'bi-clock'),
+    'pagado': ('processing', 'bi-credit-card'),
+    'enviado': ('shipped', 'bi-truck'),
+    'entregado': ('completed', 'bi-check-circle'),
+    'cancelado': ('cancelled', 'bi-x-circle'),
+}
+
+
+@register.simple_tag
+def insignia_estado(pedido):
+    clase, icono = INSIGNIAS.get(pedido.estado, INSIGNIAS['pendiente'])
+    return format_html(
+        '<span class="status-badge {}"><i class="bi {}"></i> {}</span>',
+        clase, icono, pedido.get_estado_display(),
+    )
+
+
+@register.simple_tag
+def insignias_estado():
+    """La misma tabla como JSON (<script id="insignias-estado">) para el navegador."""
+    return json_script(INSIGNIAS, 'insignias-estado')
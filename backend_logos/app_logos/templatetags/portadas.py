@@ -0,0 +1,96 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..miniaturas import ANCHOS, FORMATOS, encolar, nombre_variante, variantes_existen
+
+register = template.Library()
+
+# Portadas cuyas variantes ya se comprobaron en este proceso, para no revisar el disco en cada render
+_verificadas = set()
+
+
+def _variantes_listas(libro):
+    """
+    Indica si las variantes de la portada ya están en disco. Si falta algo
+    (variantes o metadatos) se encola su generación: Pillow nunca corre
+    durante el render, y mientras tanto se usa la imagen original.
+    """
+    nombre = libro.imagen.name
+    if nombre in _verificadas:
+        return True
+    existen = variantes_existen(nombre)
+    if existen and libro.imagen_placeholder:
+        _verificadas.add(nombre)
+    else:
+        encolar(nombre)
+    return existen
+
+
+@register.simple_tag
+def miniatura(libro, ancho=240, formato='jpg'):
+    """
+    URL de la variante de la portada con el ancho y formato pedidos.
+    Si las variantes aún no existen se usa la imagen original y se encola
+    su generación.
+
+    Uso: {% load portadas %}<img src="{% miniatura libro 240 'webp' %}">
+    """
+    imagen = libro.imagen
+    if not imagen:
+        return ''
+    if ancho not in ANCHOS or formato not in FORMATOS or not _variantes_listas(libro):
+        return imagen.url
+    return imagen.storage.url(nombre_variante(imagen.name, ancho, formato))
+
+
+@register.simple_tag
+def portada(libro, sizes='240px', lazy=True):
+    """
+    <picture> completo para la portada: srcset WebP y JPEG con todos los
+    anchos generados, sizes, carga diferida, dimensiones explícitas (para
+    que la página no salte al cargar) y el marcador borroso de fondo.
+
+    Uso: {% portada libro sizes="(max-width: 576px) 45vw, 220px" %}
+         {% portada libro sizes="60px" lazy=False %}
+    """
+    imagen = libro.imagen
+    if not imagen:
+        return ''
+    carga = 'lazy' if lazy else 'eager'
+    if not _variantes_listas(libro):
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async">',
+            imagen.url, libro.titulo, carga,
+        )
+
+    # Las variantes nunca son más anchas que el original; los descriptores 'w' usan el ancho real
+    ancho_original = libro.imagen_ancho
+    anchos = {}
+    for ancho in ANCHOS:
+        anchos.setdefault(min(ancho, ancho_original) if ancho_original else ancho, ancho)
+
+    def srcset(formato):
+        return ', '.join(
+            f"{imagen.storage.url(nombre_variante(imagen.name, nominal, formato))} {real}w"
+            for real, nominal in anchos.items()
+        )
+
+    dimensiones = format_html_join(
+        ' ', '{}="{}"',
+        [(atributo, valor) for atributo, valor in (('width', libro.imagen_ancho), ('height', libro.imagen_alto)) if valor],
+    )
+    estilo = ''
+    if libro.imagen_placeholder:
+        estilo = format_html(
+            ' style="background-image: url({}); background-size: cover; background-position: center;"',
+            libro.imagen_placeholder,
+        )
+    return format_html(
+        '<picture style="display: contents;">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" {} loading="{}" decoding="async"{}>'
+        '</picture>',
+        srcset('webp'), sizes,
+        imagen.storage.url(nombre_variante(imagen.name, 240, 'jpg')), srcset('jpg'), sizes,
+        libro.titulo, dimensiones, carga, estilo,
+    )
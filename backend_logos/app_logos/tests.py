@@ -0,0 +1,1723 @@
+import cProfile
+import csv
+import gc
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from io import StringIO
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from . import consultas_lentas, middleware, miniaturas, notificaciones, perfilado, routers, urls, views
+from .admin import LibroAdmin
+from .autenticacion import UsuarioEnCacheBackend, invalidar_usuarios
+from .backends.sqlite3.base import DatabaseWrapper
+from .catalogo import ajustar_libros, filtrar_libros, invalidar_catalogo, version_catalogo
+from .forms import LibroForm
+from .importacion import ImportadorCatalogo
+from .models import (
+    Autor, Carrito, Categoria, ConsultaLenta, DetalleOrden, DetalleOrdenArchivado, EventoPedido, Libro, Orden,
+    OrdenArchivada, PerfilUsuario,
+)
+from .paginacion import ConteoEstimadoPaginator
+from .storage import AlmacenamientoPorContenido, EstaticosComprimidos, es_nombre_por_contenido, minificar_css
+from .templatetags import portadas
+from .templatetags.pedidos import INSIGNIAS
+
+# "SCAN tabla" sin "USING INDEX": SQLite recorre la tabla completa
+ESCANEO_COMPLETO = re.compile(r'^SCAN (\w+)$')
+
+# Recorridos completos aceptados en cualquier vista
+ESCANEOS_PERMITIDOS = {
+    # Tabla de decenas de filas que se muestra entera (menú de categorías, formularios)
+    'app_logos_categoria',
+}
+
+
+def setUpModule():
+    # Una línea JSON por petición (app_logos.rendimiento) llenaría la salida de las pruebas;
+    # las que la revisan la capturan con assertLogs
+    logging.getLogger('app_logos.rendimiento').setLevel(logging.WARNING)
+
+
+def tearDownModule():
+    logging.getLogger('app_logos.rendimiento').setLevel(settings.LOGGING['loggers']['app_logos.rendimiento']['level'])
+
+
+@skipUnless(connection.vendor == 'sqlite', "Los planes se comparan con la salida de EXPLAIN QUERY PLAN de SQLite")
+class PlanesDeConsultaTests(TestCase):
+    """
+    Ejecuta cada vista, pide a SQLite el plan de todas sus consultas y falla
+    si alguna recorre una tabla completa. Un índice que se borre o una
+    consulta que deje de poder usarlo (p. ej. filtrar con __date) se detecta aquí.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        autores = Autor.objects.bulk_create([Autor(nombre=f"Autor {i}", apellido="Prueba") for i in range(5)])
+        categorias = [Categoria.objects.create(nombre=f"Categoría {i}") for i in range(3)]
+        Libro.objects.bulk_create([
+            Libro(
+                titulo=f"Libro {i}", autor=autores[i % 5], categoria=categorias[i % 3], descripcion="-",
+                precio=100 + i, stock=10, activo=i % 7 != 0, destacado=i % 5 == 0,
+            )
+            for i in range(60)
+        ])
+        cls.categoria = categorias[0]
+
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+        for usuario in (cls.cliente, cls.admin):
+            PerfilUsuario.objects.get_or_create(usuario=usuario)
+        libros = list(Libro.objects.all()[:3])
+        for i, estado in enumerate(['pendiente', 'pagado', 'entregado']):
+            orden = Orden.objects.create(cliente=cls.cliente, total=100, subtotal=100, estado=estado, direccion_envio="Calle 1")
+            DetalleOrden.objects.create(orden=orden, libro=libros[i], cantidad=1, precio_unidad=100, subtotal=100)
+        cls.orden = orden
+        Carrito.objects.create(usuario=cls.cliente, libro=libros[0], cantidad=2)
+
+    def setUp(self):
+        # Las cachés de página y de fragmentos ocultarían las consultas
+        cache.clear()
+        self.anonimo = Client()
+        self.usuario = Client()
+        self.usuario.force_login(self.cliente)
+        self.staff = Client()
+        self.staff.force_login(self.admin)
+
+    def planes(self, cliente, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = cliente.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                # En SQLite las consultas capturadas ya traen los parámetros en el texto
+                pasos = [fila[-1] for fila in cursor.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()]
+                planes.append((sql, pasos))
+        self.assertTrue(planes, f"{url} no ejecutó consultas: ¿se sirvió desde una caché?")
+        return planes
+
+    def assertSinEscaneoCompleto(self, cliente, url, permitidos=()):
+        tablas = set(connection.introspection.table_names())
+        for sql, pasos in self.planes(cliente, url):
+            for paso in pasos:
+                coincidencia = ESCANEO_COMPLETO.match(paso)
+                if not coincidencia or coincidencia[1] not in tablas:
+                    continue
+                if coincidencia[1] in ESCANEOS_PERMITIDOS or coincidencia[1] in permitidos:
+                    continue
+                self.fail(f"{url}: recorrido completo de {coincidencia[1]}\n{sql}\n{pasos}")
+
+    def test_inicio(self):
+        self.assertSinEscaneoCompleto(self.anonimo, '/')
+
+    def test_tienda(self):
+        self.assertSinEscaneoCompleto(self.anonimo, '/tienda/')
+
+    def test_tienda_por_categoria(self):
+        self.assertSinEscaneoCompleto(self.anonimo, f'/tienda/?categoria={self.categoria.pk}')
+
+    def test_carrito(self):
+        self.assertSinEscaneoCompleto(self.usuario, '/carrito/')
+
+    def test_mis_pedidos(self):
+        self.assertSinEscaneoCompleto(self.usuario, '/mis-pedidos/')
+
+    def test_detalle_pedido(self):
+        self.assertSinEscaneoCompleto(self.usuario, f'/pedido/{self.orden.pk}/')
+
+    def test_admin_productos(self):
+        self.assertSinEscaneoCompleto(self.staff, '/admin/productos/')
+
+    def test_admin_pedidos(self):
+        self.assertSinEscaneoCompleto(self.staff, '/admin/pedidos/')
+
+    def test_exportar_pedidos_por_estado(self):
+        self.assertSinEscaneoCompleto(self.staff, '/admin/pedidos/exportar/?estado=pagado')
+
+    def test_exportar_pedidos_por_fecha(self):
+        self.assertSinEscaneoCompleto(self.staff, '/admin/pedidos/exportar/?desde=2020-01-01&hasta=2030-12-31')
+
+    def test_admin_usuarios(self):
+        # El total de la paginación cuenta todos los perfiles: recorrerlos es inevitable
+        self.assertSinEscaneoCompleto(self.staff, '/admin/usuarios/', permitidos={'app_logos_perfilusuario'})
+
+
+
+class ExportacionPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        categoria = Categoria.objects.create(nombre="Categoría")
+        cls.libro = Libro.objects.create(titulo="Libro", autor=autor, categoria=categoria, descripcion="-", precio=100, stock=10)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+
+        datos = {'cliente': cls.cliente, 'total': 100, 'subtotal': 100, 'direccion_envio': "Calle 1"}
+        cls.con_lineas = Orden.objects.create(estado='pagado', **datos)
+        for cantidad in (1, 2):
+            DetalleOrden.objects.create(orden=cls.con_lineas, libro=cls.libro, cantidad=cantidad, precio_unidad=50, subtotal=50 * cantidad)
+        cls.sin_lineas = Orden.objects.create(estado='pendiente', **datos)
+        Orden.objects.filter(pk=cls.sin_lineas.pk).update(fecha_orden=timezone.make_aware(datetime(2024, 3, 10, 12)))
+        cls.archivada = OrdenArchivada.objects.create(
+            id=cls.sin_lineas.pk + 100, estado='entregado', fecha_orden=timezone.make_aware(datetime(2023, 1, 5, 12)), **datos,
+        )
+        DetalleOrdenArchivado.objects.create(orden=cls.archivada, libro=cls.libro, cantidad=3, precio_unidad=20, subtotal=60)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def exportar(self, **filtros):
+        response = self.client.get(reverse('exportar_pedidos_csv'), filtros)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        filas = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        return filas[0], filas[1:]
+
+    def test_incluye_archivo_y_pedidos_sin_lineas(self):
+        cabecera, filas = self.exportar()
+        self.assertEqual(len(cabecera), 15)
+        # Orden cronológico: archivo, pedido sin líneas de 2024 y el pedido de hoy con dos líneas
+        self.assertEqual([int(fila[0]) for fila in filas], [self.archivada.pk, self.sin_lineas.pk, self.con_lineas.pk, self.con_lineas.pk])
+        self.assertEqual(filas[0][4], 'entregado')
+        self.assertEqual(filas[0][10:], [str(self.libro.pk), 'Libro', '3', '20.00', '60.00'])
+        self.assertEqual(filas[1][10:], [''] * 5)
+        self.assertEqual([fila[12] for fila in filas[2:]], ['1', '2'])
+
+    def test_archivo_y_activos_se_intercalan_por_fecha(self):
+        # Un pedido archivado posterior a uno activo (el activo quedó sin terminar)
+        OrdenArchivada.objects.filter(pk=self.archivada.pk).update(fecha_orden=timezone.make_aware(datetime(2024, 6, 1, 12)))
+        _, filas = self.exportar()
+        self.assertEqual([int(fila[0]) for fila in filas], [self.sin_lineas.pk, self.archivada.pk, self.con_lineas.pk, self.con_lineas.pk])
+
+    def test_limites_de_fecha_incluyen_el_dia_completo(self):
+        _, filas = self.exportar(desde='2023-01-05', hasta='2024-03-10')
+        self.assertEqual([int(fila[0]) for fila in filas], [self.archivada.pk, self.sin_lineas.pk])
+        _, filas = self.exportar(desde='2023-01-06', hasta='2024-03-09')
+        self.assertEqual(filas, [])
+
+    def test_filtro_por_estado(self):
+        _, filas = self.exportar(estado='entregado')
+        self.assertEqual([int(fila[0]) for fila in filas], [self.archivada.pk])
+        # Un estado desconocido no filtra
+        self.assertEqual(len(self.exportar(estado='otro')[1]), 4)
+
+
+class ArchivoPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        categoria = Categoria.objects.create(nombre="Categoría")
+        cls.libro = Libro.objects.create(titulo="Libro archivado", autor=autor, categoria=categoria, descripcion="-", precio=100, stock=10)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+
+        datos = {'cliente': cls.cliente, 'total': 100, 'subtotal': 100, 'direccion_envio': "Calle 1"}
+        hace_dos_anios = timezone.now() - timedelta(days=730)
+        cls.vieja = Orden.objects.create(estado='entregado', **datos)
+        DetalleOrden.objects.create(orden=cls.vieja, libro=cls.libro, cantidad=2, precio_unidad=50, subtotal=100)
+        # Vieja pero sin terminar: no se archiva
+        cls.abierta = Orden.objects.create(estado='pendiente', **datos)
+        cls.reciente = Orden.objects.create(estado='entregado', **datos)
+        Orden.objects.filter(pk__in=[cls.vieja.pk, cls.abierta.pk]).update(fecha_orden=hace_dos_anios)
+
+    def setUp(self):
+        self.client.force_login(self.cliente)
+
+    def archivar(self, *opciones):
+        salida = StringIO()
+        call_command('archivar_pedidos', *opciones, stdout=salida)
+        return salida.getvalue()
+
+    def test_dry_run_no_mueve_nada(self):
+        self.assertIn("Órdenes a archivar: 1", self.archivar('--dry-run'))
+        self.assertEqual(Orden.objects.count(), 3)
+        self.assertFalse(OrdenArchivada.objects.exists())
+
+    def test_mueve_orden_y_lineas_al_archivo(self):
+        self.archivar()
+        self.assertEqual(set(Orden.objects.values_list('pk', flat=True)), {self.abierta.pk, self.reciente.pk})
+        self.assertFalse(DetalleOrden.objects.filter(orden_id=self.vieja.pk).exists())
+        archivada = OrdenArchivada.objects.get(pk=self.vieja.pk)
+        self.assertEqual((archivada.cliente, archivada.estado), (self.cliente, 'entregado'))
+        self.assertEqual(list(archivada.detalles.values_list('libro_id', 'cantidad')), [(self.libro.pk, 2)])
+
+    def test_el_cliente_sigue_viendo_la_orden_archivada(self):
+        self.archivar()
+        response = self.client.get(reverse('mis_pedidos'))
+        self.assertEqual([pedido.pk for pedido in response.context['pedidos_anteriores']], [self.vieja.pk])
+        self.assertContains(response, reverse('detalle_pedido', args=[self.vieja.pk]))
+        response = self.client.get(reverse('detalle_pedido', args=[self.vieja.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Libro archivado")
+        # Ya no cambia de estado: no abre el flujo SSE
+        self.assertNotContains(response, 'EventSource')
+        self.assertContains(self.client.get(reverse('detalle_pedido', args=[self.reciente.pk])), 'EventSource')
+
+
+class AjusteCatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        cls.categoria = Categoria.objects.create(nombre="Ajustes")
+        otra = Categoria.objects.create(nombre="Otra")
+        cls.libro = Libro.objects.create(titulo="Ajustado", autor=autor, categoria=cls.categoria, descripcion="-", precio=Decimal('19.99'), stock=3)
+        cls.intacto = Libro.objects.create(titulo="Intacto", autor=autor, categoria=otra, descripcion="-", precio=Decimal('19.99'), stock=3)
+
+    def ajustar(self, **ajustes):
+        modificados = ajustar_libros(filtrar_libros(categorias=[self.categoria.pk]), **ajustes)
+        self.libro.refresh_from_db()
+        self.intacto.refresh_from_db()
+        self.assertEqual(self.intacto.precio, Decimal('19.99'))
+        return modificados
+
+    def test_porcentaje_redondea_a_centavos(self):
+        self.assertEqual(self.ajustar(porcentaje=Decimal('10')), 1)
+        self.assertEqual(self.libro.precio, Decimal('21.99'))
+
+    def test_monto_redondea_a_centavos(self):
+        self.ajustar(monto=Decimal('0.015'))
+        self.assertEqual(self.libro.precio, Decimal('20.01'))
+        self.ajustar(monto=Decimal('0.1'))
+        self.assertEqual(self.libro.precio, Decimal('20.11'))
+
+    def test_precio_y_stock_no_bajan_de_cero(self):
+        self.ajustar(monto=Decimal('-50'), stock=-10)
+        self.assertEqual((self.libro.precio, self.libro.stock), (Decimal('0'), 0))
+
+    def test_invalida_la_version_del_catalogo_solo_si_hay_cambios(self):
+        version = version_catalogo()
+        self.assertEqual(ajustar_libros(filtrar_libros(ids=[0]), porcentaje=Decimal('5')), 0)
+        self.assertEqual(version_catalogo(), version)
+        self.ajustar(stock=1)
+        self.assertNotEqual(version_catalogo(), version)
+
+
+class AdminUsuariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+        cls.frecuente = User.objects.create_user('frecuente', 'frecuente@example.com', 'clave-segura-123')
+        cls.grande = User.objects.create_user('grande', 'grande@example.com', 'clave-segura-123')
+        cls.nuevo = User.objects.create_user('nuevo', 'nuevo@example.com', 'clave-segura-123')
+        datos = {'subtotal': 0, 'direccion_envio': "Calle 1"}
+        Orden.objects.create(cliente=cls.frecuente, total=100, **datos)
+        Orden.objects.create(cliente=cls.frecuente, total=50, **datos)
+        Orden.objects.create(cliente=cls.grande, total=300, **datos)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def listar(self, **parametros):
+        response = self.client.get(reverse('admin_usuarios'), parametros)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def nombres(self, response):
+        return [perfil.usuario.username for perfil in response.context['perfiles']]
+
+    def test_totales_por_usuario(self):
+        totales = {
+            perfil.usuario.username: (perfil.num_pedidos, perfil.total_gastado)
+            for perfil in self.listar().context['perfiles']
+        }
+        self.assertEqual(totales['frecuente'], (2, Decimal('150')))
+        self.assertEqual(totales['grande'], (1, Decimal('300')))
+        # Sin pedidos: cero, no None
+        self.assertEqual(totales['nuevo'], (0, Decimal('0')))
+
+    def test_ordenamientos(self):
+        self.assertEqual(self.nombres(self.listar(orden='-gastado'))[:2], ['grande', 'frecuente'])
+        self.assertEqual(self.nombres(self.listar(orden='-pedidos'))[:2], ['frecuente', 'grande'])
+        self.assertEqual(self.nombres(self.listar(orden='registro')), ['admin', 'frecuente', 'grande', 'nuevo'])
+        # Sin pedidos (último pedido nulo) van al final en orden descendente
+        self.assertEqual(self.nombres(self.listar(orden='-ultimo'))[-2:], ['nuevo', 'admin'])
+
+    def test_orden_invalido_usa_el_registro(self):
+        response = self.listar(orden='-password')
+        self.assertEqual(response.context['orden'], '-registro')
+        self.assertEqual(self.nombres(response), ['nuevo', 'grande', 'frecuente', 'admin'])
+
+    def test_paginacion(self):
+        usuarios = User.objects.bulk_create(User(username=f'lector{numero}') for numero in range(50))
+        PerfilUsuario.objects.bulk_create(PerfilUsuario(usuario=usuario) for usuario in usuarios)
+        self.assertEqual(len(self.listar().context['perfiles']), 50)
+        response = self.listar(orden='registro', page=2)
+        self.assertEqual(self.nombres(response), ['lector46', 'lector47', 'lector48', 'lector49'])
+        # Una página fuera de rango muestra la última
+        self.assertEqual(self.listar(page=99).context['page_obj'].number, 2)
+
+
+@mock.patch('app_logos.paginacion.UMBRAL_ESTIMACION', 5)
+@mock.patch.object(LibroAdmin, 'list_per_page', 2)
+class ListadosAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        Libro.objects.bulk_create(
+            Libro(titulo=f"Libro {numero:02}", autor=autor, descripcion="-", precio=10, stock=1) for numero in range(20)
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def listar(self, pagina):
+        return self.client.get(reverse('admin:app_logos_libro_changelist'), {'activo__exact': 1, 'o': 1, 'p': pagina})
+
+    def test_conteo_con_filtros_se_corta_despues_de_la_pagina(self):
+        libros = Libro.objects.filter(activo=True).order_by('titulo')
+        paginador = ConteoEstimadoPaginator(libros, 2)
+        self.assertEqual((paginador.count, paginador.truncado), (7, True))
+        paginador = ConteoEstimadoPaginator(libros, 2, pagina=8)
+        self.assertEqual((paginador.count, paginador.truncado, paginador.num_pages), (20, False, 10))
+
+    def test_se_puede_avanzar_mas_alla_del_limite(self):
+        response = self.listar(6)
+        self.assertContains(response, "17+ libros")
+        self.assertEqual([libro.titulo for libro in response.context['cl'].result_list], ["Libro 10", "Libro 11"])
+        # Desde la página 6 el conteo alcanza el final de la tabla
+        # Opciones del filtro de categoría, conteo limitado, la página y el carrito del
+        # procesador de contexto: ningún COUNT(*) sobre la tabla completa
+        with self.assertNumQueries(4):
+            response = self.listar(10)
+        self.assertContains(response, "20 libros")
+        self.assertEqual([libro.titulo for libro in response.context['cl'].result_list], ["Libro 18", "Libro 19"])
+
+    def test_filtro_de_texto_se_muestra(self):
+        response = self.listar(1)
+        self.assertContains(response, 'name="autor_apellido"')
+
+
+class PortadasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name, MINIATURAS_EN_SEGUNDO_PLANO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        os.makedirs(os.path.join(media.name, 'libros'))
+        Image.new('RGB', (600, 900), 'navy').save(os.path.join(media.name, 'libros', 'portada.png'))
+        # La cola no corre: las pruebas solo ven qué se encola
+        self.encoladas = self.parchear(miniaturas._cola, 'submit')
+        self.parchear(miniaturas, '_encoladas', set())
+        # Cada prueba usa otro MEDIA_ROOT: lo comprobado en otra no vale
+        self.parchear(portadas, '_verificadas', set())
+
+    def parchear(self, objeto, atributo, *valor):
+        parche = mock.patch.object(objeto, atributo, *valor)
+        self.addCleanup(parche.stop)
+        return parche.start()
+
+    def crear_libro(self):
+        return Libro.objects.create(titulo="Con portada", autor=self.autor, descripcion="-", precio=10, stock=1, imagen='libros/portada.png')
+
+    def render(self, libro):
+        return Template("{% load portadas %}{% portada libro %}").render(Context({'libro': libro}))
+
+    def test_guardar_encola_al_confirmar_sin_codificar(self):
+        with mock.patch.object(miniaturas, 'generar_variantes') as generar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.crear_libro()
+                self.encoladas.assert_not_called()
+        generar.assert_not_called()
+        self.encoladas.assert_called_once_with(miniaturas._generar_encolada, 'libros/portada.png')
+
+    def test_sin_variantes_se_muestra_el_original(self):
+        libro = self.crear_libro()
+        with mock.patch.object(miniaturas, 'generar_variantes') as generar:
+            html = self.render(libro)
+            self.render(libro)
+        generar.assert_not_called()
+        self.assertIn('<img src="/media/libros/portada.png"', html)
+        # Una sola vez mientras sigue pendiente
+        self.encoladas.assert_called_once_with(miniaturas._generar_encolada, 'libros/portada.png')
+
+    def test_comando_genera_variantes_y_metadatos(self):
+        libro = self.crear_libro()
+        salida = StringIO()
+        call_command('generar_miniaturas', '--procesos', '1', '--lote', '1', stdout=salida)
+        self.assertIn("Portadas procesadas: 1 (6 archivos generados)", salida.getvalue())
+        libro.refresh_from_db()
+        self.assertEqual((libro.imagen_ancho, libro.imagen_alto), (600, 900))
+        self.assertTrue(libro.imagen_placeholder.startswith('data:image/webp;base64,'))
+        html = self.render(libro)
+        self.assertIn('portada.480w.webp 480w', html)
+        self.assertIn('width="600" height="900"', html)
+
+
+class ProductosAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Autor.objects.create(nombre="Jorge", apellido="Luis Borges")
+        cls.categoria = Categoria.objects.create(nombre="Cuentos")
+        cls.libro = Libro.objects.create(titulo="Ficciones", autor=cls.autor, categoria=cls.categoria, descripcion="-", precio=100, stock=10)
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def importar(self, contenido, nombre='catalogo.csv'):
+        archivo = SimpleUploadedFile(nombre, contenido.encode(), content_type='text/csv')
+        return self.client.post(reverse('importar_productos'), {'archivo': archivo})
+
+    def test_importar_crea_actualiza_y_reporta_filas_invalidas(self):
+        response = self.importar(
+            "titulo,autor,categoria,precio,stock\n"
+            "Ficciones,jorge luis borges,Cuentos,120.50,3\n"
+            "Rayuela,Julio Cortázar,Novela,80,5\n"
+            "Sin precio,Alguien,,,1\n"
+            "Decimales,Alguien,,12.345,1\n"
+            "Enorme,Alguien,,1e20,1\n"
+        )
+        resultado = response.context['resultado']
+        self.assertEqual((resultado.creados, resultado.actualizados), (1, 1))
+        self.assertEqual([error.split(':')[0] for error in resultado.errores], ["Fila 3", "Fila 4", "Fila 5"])
+        self.libro.refresh_from_db()
+        self.assertEqual((self.libro.precio, self.libro.stock), (Decimal('120.50'), 3))
+        rayuela = Libro.objects.select_related('autor', 'categoria').get(titulo="Rayuela")
+        self.assertEqual((rayuela.autor.apellido, rayuela.categoria.nombre), ("Cortázar", "Novela"))
+        self.assertEqual(Autor.objects.count(), 2)
+
+    def test_categorias_con_el_mismo_slug_o_sin_slug(self):
+        Categoria.objects.create(nombre="Ciencia ficción")
+        response = self.importar(
+            "titulo,autor,categoria,precio\n"
+            "Solaris,Stanislaw Lem,Ciencia-ficción,10\n"
+            "Dune,Frank Herbert,CIENCIA FICCIÓN,10\n"
+            "Signos,Alguien,¿?,10\n"
+            "Más signos,Alguien,¡!,10\n"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resultado'].creados, 4)
+        slugs = dict(Categoria.objects.values_list('nombre', 'slug'))
+        self.assertEqual(slugs["Ciencia-ficción"], "ciencia-ficcion-2")
+        self.assertEqual({slugs["¿?"], slugs["¡!"]}, {"categoria", "categoria-2"})
+        self.assertEqual(Libro.objects.get(titulo="Dune").categoria.nombre, "Ciencia ficción")
+
+    def test_actualizar_solo_escribe_las_columnas_del_archivo(self):
+        self.importar("titulo,autor,precio\nFicciones,Jorge Luis Borges,130\n")
+        self.libro.refresh_from_db()
+        self.assertEqual(
+            (self.libro.precio, self.libro.stock, self.libro.descripcion, self.libro.categoria),
+            (Decimal('130.00'), 10, "-", self.categoria),
+        )
+
+    def test_json_se_lee_por_elementos(self):
+        libros = [{'titulo': f"Libro {i}", 'autor': "Autora Prueba", 'precio': 10 + i, 'descripcion': "x" * 50} for i in range(200)]
+        with mock.patch('app_logos.importacion.TAMANO_BLOQUE_JSON', 64):
+            response = self.importar(json.dumps({'libros': libros}, indent=1), 'catalogo.json')
+            self.assertEqual(response.context['resultado'].creados, 200)
+            self.assertEqual(Libro.objects.get(titulo="Libro 199").precio, Decimal('209.00'))
+
+            response = self.importar(json.dumps(libros)[:-500], 'roto.json')
+        self.assertIsNone(response.context['resultado'])
+        self.assertEqual(Libro.objects.filter(titulo__startswith="Libro ").count(), 200)
+        self.assertContains(response, "no se importó nada")
+
+    def test_agregar_reutiliza_el_autor_sin_distinguir_mayusculas(self):
+        response = self.client.post(reverse('agregar_producto'), {
+            'titulo': "El Aleph", 'autor': "jorge luis BORGES", 'categoria': self.categoria.pk,
+            'descripcion': "-", 'precio': '90.00', 'stock': 4, 'activo': 'on',
+        })
+        self.assertRedirects(response, reverse('admin_productos'), fetch_redirect_response=False)
+        self.assertEqual(Libro.objects.get(titulo="El Aleph").autor, self.autor)
+        self.assertEqual(Autor.objects.count(), 1)
+
+    def test_editar(self):
+        response = self.client.post(reverse('editar_producto', args=[self.libro.pk]), {
+            'titulo': "Ficciones", 'autor': "Jorge Luis Borges", 'categoria': self.categoria.pk,
+            'descripcion': "Nueva", 'precio': '150.00', 'stock': 2,
+        })
+        self.assertRedirects(response, reverse('admin_productos'), fetch_redirect_response=False)
+        self.libro.refresh_from_db()
+        self.assertEqual((self.libro.descripcion, self.libro.precio, self.libro.activo), ("Nueva", Decimal('150.00'), False))
+
+    def test_eliminar_sin_pedidos_borra_el_libro(self):
+        self.client.post(reverse('eliminar_producto', args=[self.libro.pk]))
+        self.assertFalse(Libro.objects.filter(pk=self.libro.pk).exists())
+
+    def test_eliminar_con_pedidos_lo_desactiva(self):
+        orden = Orden.objects.create(cliente=self.admin, total=100, subtotal=100, direccion_envio="Calle 1")
+        DetalleOrden.objects.create(orden=orden, libro=self.libro, cantidad=1, precio_unidad=100, subtotal=100)
+        self.client.post(reverse('eliminar_producto', args=[self.libro.pk]))
+        self.libro.refresh_from_db()
+        self.assertFalse(self.libro.activo)
+
+
+class CacheFragmentosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        cls.libro = Libro.objects.create(titulo="Título original", autor=autor, descripcion="-", precio=10, stock=1)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        # Con sesión la página completa no se cachea: solo quedan los fragmentos
+        self.client.force_login(self.cliente)
+
+    def test_tarjeta_se_renueva_con_la_version_del_catalogo(self):
+        self.assertContains(self.client.get(reverse('tienda')), "Título original")
+        # update() no dispara señales: la tarjeta sigue en caché
+        Libro.objects.filter(pk=self.libro.pk).update(titulo="Título nuevo")
+        self.assertContains(self.client.get(reverse('tienda')), "Título original")
+        invalidar_catalogo()
+        response = self.client.get(reverse('tienda'))
+        self.assertContains(response, "Título nuevo")
+        self.assertNotContains(response, "Título original")
+
+    def test_menu_separado_por_rol(self):
+        admin = Client()
+        admin.force_login(self.admin)
+        self.assertContains(admin.get(reverse('tienda')), "Panel Django")
+        self.assertNotContains(self.client.get(reverse('tienda')), "Panel Django")
+
+
+# Sin páginas prerenderizadas: sobre_nosotros y contacto pasan por la vista
+@override_settings(PAGINAS_PRERENDERIZADAS_DIR=os.path.join(tempfile.gettempdir(), 'logos-sin-prerender'))
+class CachePaginasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        cls.libro = Libro.objects.create(titulo="Título original", autor=autor, descripcion="-", precio=10, stock=1)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_segunda_visita_anonima_no_consulta_la_base(self):
+        primera = self.client.get(reverse('tienda'))
+        with self.assertNumQueries(0):
+            segunda = self.client.get(reverse('tienda'))
+        self.assertEqual(segunda.content, primera.content)
+        self.assertIn('Cookie', segunda['Vary'])
+
+    def test_cambio_de_catalogo_invalida_la_pagina(self):
+        self.client.get(reverse('tienda'))
+        Libro.objects.filter(pk=self.libro.pk).update(titulo="Título nuevo")
+        self.assertContains(self.client.get(reverse('tienda')), "Título original")
+        invalidar_catalogo()
+        self.assertContains(self.client.get(reverse('tienda')), "Título nuevo")
+
+    def test_token_csrf_no_se_guarda(self):
+        csrf = 'name="csrfmiddlewaretoken" value="'
+        primera = self.client.get(reverse('contacto'))
+        self.assertNotContains(primera, csrf + '"')
+        # La copia en caché se sirve sin token; base.html lo pide a estado_sesion
+        self.assertContains(Client().get(reverse('contacto')), csrf + '"')
+
+    def test_estado_sesion_completa_la_pagina(self):
+        estado = self.client.get(reverse('estado_sesion')).json()
+        self.assertEqual((estado['autenticado'], estado['num_items_carrito']), (False, 0))
+        self.assertTrue(estado['csrf_token'])
+
+        Carrito.objects.create(usuario=self.cliente, libro=self.libro, cantidad=3)
+        self.client.force_login(self.cliente)
+        estado = self.client.get(reverse('estado_sesion')).json()
+        self.assertEqual((estado['autenticado'], estado['num_items_carrito']), (True, 3))
+
+    def test_con_sesion_o_mensajes_no_se_usa_la_cache(self):
+        self.client.get(reverse('tienda'))
+        # bulk_create no cambia la versión del catálogo: solo lo ve quien no recibe la copia guardada
+        Libro.objects.bulk_create([Libro(titulo="Libro sin señal", autor=self.libro.autor, descripcion="-", precio=10, stock=1)])
+        self.assertNotContains(self.client.get(reverse('tienda')), "Libro sin señal")
+        self.client.force_login(self.cliente)
+        self.assertContains(self.client.get(reverse('tienda')), "Libro sin señal")
+        anonimo = Client()
+        anonimo.cookies['messages'] = 'pendientes'
+        self.assertContains(anonimo.get(reverse('tienda')), "Libro sin señal")
+
+
+class NegociacionHttpTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        cls.libro = Libro.objects.create(titulo="Libro", autor=autor, descripcion="-", precio=10, stock=1)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_devuelve_304_hasta_que_cambia_el_catalogo(self):
+        etag = self.client.get(reverse('tienda'))['ETag']
+        response = self.client.get(reverse('tienda'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        invalidar_catalogo()
+        response = self.client.get(reverse('tienda'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_con_sesion_cambia_con_el_carrito(self):
+        anonimo = self.client.get(reverse('tienda'))['ETag']
+        self.client.force_login(self.cliente)
+        etag = self.client.get(reverse('tienda'))['ETag']
+        self.assertNotEqual(etag, anonimo)
+        Carrito.objects.create(usuario=self.cliente, libro=self.libro, cantidad=1)
+        self.assertEqual(self.client.get(reverse('tienda'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_sin_etag_con_mensajes_pendientes(self):
+        self.client.cookies['messages'] = 'pendientes'
+        self.assertFalse(self.client.get(reverse('tienda')).has_header('ETag'))
+
+    @skipUnless(middleware.brotli, "Brotli no está instalado")
+    def test_brotli_si_el_navegador_lo_acepta(self):
+        plano = self.client.get(reverse('tienda'))
+        self.assertFalse(plano.has_header('Content-Encoding'))
+        response = self.client.get(reverse('tienda'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(middleware.brotli.decompress(response.content), plano.content)
+
+    def test_gzip_sin_brotli(self):
+        plano = self.client.get(reverse('tienda'))
+        response = self.client.get(reverse('tienda'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plano.content)
+
+    def test_respuestas_pequenas_sin_comprimir(self):
+        response = self.client.get(reverse('estado_sesion'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertLess(len(response.content), settings.COMPRESION_MINIMO_BYTES)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(middleware.brotli, "Brotli no está instalado")
+    def test_exportacion_en_streaming_con_brotli(self):
+        self.client.force_login(self.admin)
+        plano = b''.join(self.client.get(reverse('exportar_pedidos_csv')).streaming_content)
+        response = self.client.get(reverse('exportar_pedidos_csv'), HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(b''.join(response.streaming_content)), plano)
+
+
+class PaginasPrerenderizadasTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(PAGINAS_PRERENDERIZADAS_DIR=directorio.name, DEBUG=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        call_command('prerenderizar_paginas', 'contacto', stdout=StringIO())
+        cache.clear()
+
+    def test_se_sirven_con_las_cabeceras_de_seguridad(self):
+        # Un Client nuevo arma otra vez la cadena de middlewares y carga las páginas
+        with self.assertNumQueries(0):
+            response = Client().get(reverse('contacto'))
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(Client().get(reverse('contacto'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class SqliteBackendTests(TestCase):
+    ALIAS = 'sqlite_archivo'
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        # La base de pruebas vive en memoria, sin WAL ni mmap: se prueba con un archivo
+        self.ajustes = {**connection.settings_dict, 'NAME': os.path.join(directorio.name, 'prueba.sqlite3'), 'OPTIONS': {}}
+
+        self.addCleanup(self.desconectar)
+
+    def conectar(self, **opciones):
+        # Cada hilo registra la suya: transaction.atomic(using=...) la busca en connections
+        conexion = DatabaseWrapper({**self.ajustes, 'OPTIONS': opciones}, self.ALIAS)
+        connections[self.ALIAS] = conexion
+        return conexion
+
+    def desconectar(self):
+        if self.ALIAS in connections:
+            connections[self.ALIAS].close()
+            del connections[self.ALIAS]
+
+    def pragma(self, conexion, nombre):
+        with conexion.cursor() as cursor:
+            cursor.execute(f"PRAGMA {nombre}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_de_cada_conexion(self):
+        conexion = self.conectar()
+        self.assertEqual(self.pragma(conexion, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conexion, 'busy_timeout'), 20000)
+        self.assertEqual(self.pragma(conexion, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(conexion, 'cache_size'), -20000)
+        self.assertEqual(self.pragma(conexion, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma(conexion, 'mmap_size'), 128 * 1024 * 1024)
+
+    def test_options_cambian_los_pragmas(self):
+        conexion = self.conectar(pragmas={'busy_timeout': 500})
+        self.assertEqual(self.pragma(conexion, 'busy_timeout'), 500)
+        self.assertEqual(conexion.get_connection_params()['timeout'], 0.5)
+
+    def test_atomic_empieza_con_begin_immediate(self):
+        conexion = self.conectar()
+        with CaptureQueriesContext(conexion) as consultas:
+            with transaction.atomic(using=self.ALIAS):
+                with conexion.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+        self.assertEqual(consultas[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_escritores_concurrentes_esperan_su_turno(self):
+        with self.conectar().cursor() as cursor:
+            cursor.execute("CREATE TABLE contador (valor INTEGER)")
+            cursor.execute("INSERT INTO contador VALUES (0)")
+        errores = []
+
+        def leer_y_escribir():
+            # Lee y después escribe: con BEGIN diferido dos de estos se bloquean entre sí y
+            # SQLite aborta uno con "database is locked" sin esperar a busy_timeout
+            conexion = self.conectar()
+            try:
+                with transaction.atomic(using=self.ALIAS), conexion.cursor() as cursor:
+                    cursor.execute("SELECT valor FROM contador")
+                    valor = cursor.fetchone()[0]
+                    time.sleep(0.02)
+                    cursor.execute("UPDATE contador SET valor = %s", [valor + 1])
+            except OperationalError as error:
+                errores.append(error)
+            finally:
+                self.desconectar()
+
+        hilos = [threading.Thread(target=leer_y_escribir) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        # Ninguna actualización se perdió: cada escritor leyó el valor del anterior
+        with self.conectar().cursor() as cursor:
+            cursor.execute("SELECT valor FROM contador")
+            self.assertEqual(cursor.fetchone()[0], 4)
+
+
+# Aquí los on_commit se ejecutan: sin esto la portada de los libros creados se generaría
+# en el hilo de fondo, que escribe en la base de datos mientras la prueba la vacía
+@override_settings(MINIATURAS_EN_SEGUNDO_PLANO=False)
+class ReplicasTests(TransactionTestCase):
+    # Sin la transacción que envuelve cada TestCase, para que el router elija réplica.
+    # La réplica no existe: cualquier lectura que la use falla con ConnectionDoesNotExist.
+    REPLICA = 'replica_atrasada'
+
+    @contextmanager
+    def con_replica(self):
+        # _escribio sigue en True después de crear los datos de la prueba
+        token = routers._escribio.set(False)
+        try:
+            with override_settings(DATABASE_REPLICAS=[self.REPLICA]):
+                yield
+        finally:
+            routers._escribio.reset(token)
+
+    def test_router(self):
+        router = routers.ReplicaRouter()
+        with self.con_replica():
+            self.assertEqual(router.db_for_read(Libro), self.REPLICA)
+            self.assertEqual(router.db_for_read(Orden), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Libro), 'default')
+            libro = Libro(titulo="Leído del primario")
+            libro._state.db = 'default'
+            self.assertEqual(router.db_for_read(Autor, instance=libro), 'default')
+            self.assertEqual(router.db_for_write(Libro), 'default')
+            # Lo que resta de la petición ya no usa la réplica
+            self.assertEqual(router.db_for_read(Libro), 'default')
+
+    def test_cookie_primario_hasta(self):
+        def vista_que_escribe(request):
+            self.assertFalse(routers.leer_del_primario())
+            routers.fijar_primario()
+            return HttpResponse()
+
+        def vista_que_lee(request):
+            return HttpResponse(str(routers.leer_del_primario()))
+
+        fabrica = RequestFactory()
+        with self.con_replica():
+            response = routers.PrimarioStickyMiddleware(vista_que_escribe)(fabrica.get('/'))
+            cookie = response.cookies[routers.COOKIE_PRIMARIO]
+            self.assertEqual(cookie['max-age'], settings.REPLICA_PRIMARIO_SEGUNDOS)
+            self.assertGreater(float(cookie.value), time.time())
+
+            middleware = routers.PrimarioStickyMiddleware(vista_que_lee)
+            siguiente = fabrica.get('/')
+            siguiente.COOKIES[routers.COOKIE_PRIMARIO] = cookie.value
+            self.assertEqual(middleware(siguiente).content, b'True')
+            vencida = fabrica.get('/')
+            vencida.COOKIES[routers.COOKIE_PRIMARIO] = str(time.time() - 1)
+            self.assertEqual(middleware(vencida).content, b'False')
+            self.assertNotIn(routers.COOKIE_PRIMARIO, middleware(vencida).cookies)
+
+    def test_importar_lee_autores_y_libros_del_primario(self):
+        autor = Autor.objects.create(nombre="Julio", apellido="Cortázar")
+        Libro.objects.create(titulo="Rayuela", autor=autor, descripcion="-", precio=10, stock=1)
+        with self.con_replica():
+            resultado = ImportadorCatalogo().importar([
+                {'titulo': "Rayuela", 'autor': "julio cortázar", 'precio': '12', 'stock': '2'},
+                {'titulo': "Bestiario", 'autor': "Julio Cortázar", 'precio': '9', 'stock': '1'},
+            ])
+        self.assertEqual((resultado.creados, resultado.actualizados, resultado.errores), (1, 1, []))
+        self.assertEqual(Autor.objects.count(), 1)
+        self.assertEqual(Libro.objects.filter(titulo="Rayuela").count(), 1)
+
+    def test_formulario_busca_el_autor_en_el_primario(self):
+        autor = Autor.objects.create(nombre="Horacio", apellido="Quiroga")
+        categoria = Categoria.objects.create(nombre="Cuentos")
+        form = LibroForm({
+            'titulo': "Cuentos de la selva", 'autor': "HORACIO QUIROGA", 'categoria': categoria.pk,
+            'descripcion': "-", 'precio': '10', 'stock': 1,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.con_replica():
+            libro = form.save()
+        self.assertEqual(libro.autor, autor)
+
+    def test_sincronizar_replicas(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        primario, replica = (os.path.join(directorio.name, nombre) for nombre in ('primario.sqlite3', 'replica.sqlite3'))
+        with closing(sqlite3.connect(primario)) as origen, origen:
+            origen.execute("CREATE TABLE prueba (valor TEXT)")
+            origen.execute("INSERT INTO prueba VALUES ('copiado')")
+
+        version = version_catalogo()
+        bases = {'default': {**settings.DATABASES['default'], 'NAME': primario}, self.REPLICA: {'NAME': replica}}
+        with mock.patch.dict(settings.DATABASES, bases), override_settings(DATABASE_REPLICAS=[self.REPLICA]):
+            salida = StringIO()
+            call_command('sincronizar_replicas', stdout=salida)
+        self.assertIn("Réplicas sincronizadas: 1", salida.getvalue())
+        with closing(sqlite3.connect(replica)) as copia:
+            self.assertEqual(copia.execute("SELECT valor FROM prueba").fetchall(), [('copiado',)])
+            self.assertEqual(copia.execute("PRAGMA journal_mode").fetchone(), ('wal',))
+        # Las páginas guardadas mientras la réplica estaba atrasada se descartan
+        self.assertNotEqual(version_catalogo(), version)
+
+
+class RespuestaLentaMiddleware:
+    # Trabajo de 50 ms en la fase de respuesta, después de la vista
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        time.sleep(0.05)
+        return response
+
+
+class ServerTimingTests(TestCase):
+
+    def tiempos(self, response):
+        return {fase: float(dur) for fase, dur in re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])}
+
+    def test_middlewares_de_respuesta_no_cuentan_como_vista(self):
+        # Justo después de ServerTimingMiddleware: sale de la vista antes de dormir
+        middlewares = [*settings.MIDDLEWARE]
+        middlewares.insert(1, 'app_logos.tests.RespuestaLentaMiddleware')
+        with override_settings(MIDDLEWARE=middlewares):
+            tiempos = self.tiempos(self.client.get(reverse('estado_sesion')))
+        self.assertGreaterEqual(tiempos['mw'], 50)
+        self.assertLess(tiempos['view'], 50)
+        self.assertGreaterEqual(tiempos['total'], tiempos['mw'] + tiempos['view'])
+
+    def test_sin_vista_no_se_sale_de_ninguna_fase(self):
+        tiempos = self.tiempos(self.client.get('/no-existe/'))
+        self.assertEqual(tiempos['view'], 0)
+        self.assertGreater(tiempos['mw'], 0)
+
+
+class MetricasCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        Libro.objects.create(titulo="Libro", autor=autor, descripcion="-", precio=10, stock=1)
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        cache.clear()
+
+    def busquedas(self, uso):
+        return tuple(
+            REGISTRY.get_sample_value('logos_cache_total', {'uso': uso, 'resultado': resultado}) or 0
+            for resultado in ('acierto', 'fallo')
+        )
+
+    def assertBusquedas(self, uso, antes, aciertos, fallos):
+        despues = self.busquedas(uso)
+        self.assertEqual((despues[0] - antes[0], despues[1] - antes[1]), (aciertos, fallos))
+
+    def test_version_del_catalogo(self):
+        antes = self.busquedas('version_catalogo')
+        version_catalogo()
+        version_catalogo()
+        self.assertBusquedas('version_catalogo', antes, 1, 1)
+
+    def test_fragmentos_sesion_y_usuario(self):
+        self.client.force_login(self.cliente)
+        # force_login deja la sesión en caché; el usuario se carga en la primera petición
+        antes = {uso: self.busquedas(uso) for uso in ('fragmento', 'sesion', 'usuario')}
+        self.client.get(reverse('tienda'))
+        self.client.get(reverse('tienda'))
+        self.assertBusquedas('sesion', antes['sesion'], 2, 0)
+        self.assertBusquedas('usuario', antes['usuario'], 1, 1)
+        # Menú, pie y una tarjeta: fallan la primera vez y aciertan la segunda
+        self.assertBusquedas('fragmento', antes['fragmento'], 3, 3)
+
+        cache.clear()
+        antes = self.busquedas('sesion')
+        self.client.get(reverse('tienda'))
+        self.assertBusquedas('sesion', antes, 0, 1)
+
+
+class MetricasAccesoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura-123')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+
+    def assertMetricas(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(response, 'logos_cache_total')
+
+    @override_settings(METRICAS_TOKEN='')
+    def test_sin_token_solo_administradores(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        self.client.force_login(self.cliente)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        # Sin token configurado, un Bearer cualquiera no abre la puerta
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertMetricas(self.client.get(reverse('metricas')))
+
+    @override_settings(METRICAS_TOKEN='secreto-de-prueba')
+    def test_con_token_se_exige_el_bearer(self):
+        self.assertMetricas(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto-de-prueba'))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='secreto-de-prueba').status_code, 403)
+        # El token sustituye a la sesión: un administrador sin él tampoco entra
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+
+class ConsultasLentasTests(TestCase):
+    def setUp(self):
+        # Cada prueba parte sin consultas pendientes en este hilo
+        self.addCleanup(consultas_lentas._pendientes().clear)
+        consultas_lentas._pendientes().clear()
+
+    def test_fuera_de_una_peticion_se_guarda_al_confirmar(self):
+        with override_settings(CONSULTAS_LENTAS_MS=0), self.assertLogs('app_logos.consultas_lentas', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                list(Categoria.objects.filter(nombre="Ninguna"))
+                self.assertFalse(ConsultaLenta.objects.exists())
+        consulta = ConsultaLenta.objects.get(sql__contains='"app_logos_categoria"')
+        self.assertEqual(consulta.vista, '')
+        self.assertFalse(consultas_lentas._pendientes())
+
+    def test_en_una_peticion_se_guarda_al_terminar(self):
+        with override_settings(CONSULTAS_LENTAS_MS=0), self.assertLogs('app_logos.consultas_lentas', 'WARNING'):
+            self.client.get(reverse('inicio'))
+        self.assertTrue(ConsultaLenta.objects.filter(vista='inicio').exists())
+        self.assertFalse(consultas_lentas._pendientes())
+
+    def test_las_pendientes_tienen_tope(self):
+        del consultas_lentas._hilo.pendientes
+        self.addCleanup(delattr, consultas_lentas._hilo, 'pendientes')
+        token = perfilado.iniciar()
+        try:
+            with mock.patch.object(consultas_lentas, 'MAXIMO_PENDIENTES', 3), self.assertLogs('app_logos.consultas_lentas', 'WARNING'):
+                for i in range(10):
+                    consultas_lentas._registrar(connection, f"UPDATE tabla_{i} SET a = 1", (), False, 150)
+        finally:
+            perfilado.terminar(token)
+        pendientes = consultas_lentas._pendientes()
+        self.assertEqual(len(pendientes), 3)
+        self.assertIn('tabla_9', pendientes[-1]['sql'])
+
+    def test_no_registra_el_control_de_transacciones(self):
+        ejecutar = mock.Mock(return_value=None)
+        contexto = {'connection': connection}
+        with override_settings(CONSULTAS_LENTAS_MS=0), mock.patch.object(consultas_lentas, '_registrar') as registrar:
+            for sql in ("BEGIN IMMEDIATE", "COMMIT", "ROLLBACK", 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"'):
+                consultas_lentas.registrar_si_lenta(ejecutar, sql, None, False, contexto)
+            registrar.assert_not_called()
+            consultas_lentas.registrar_si_lenta(ejecutar, "SELECT 1", None, False, contexto)
+            registrar.assert_called_once()
+        self.assertEqual(ejecutar.call_count, 6)
+
+    def test_los_planes_tienen_tope(self):
+        with mock.patch.object(consultas_lentas, '_planes', {}) as planes, \
+                mock.patch.object(consultas_lentas, 'MAXIMO_PLANES', 3), \
+                self.assertLogs('app_logos.consultas_lentas', 'WARNING'):
+            for i in range(10):
+                consultas_lentas._registrar(connection, f"UPDATE tabla_{i} SET a = 1", (), False, 150)
+            self.assertEqual(len(planes), 3)
+            self.assertIn(hashlib.md5(b'UPDATE tabla_9 SET a = ?').hexdigest(), planes)
+
+
+class UsuarioEnCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('lectora', password='clave-segura-123')
+        self.backend = UsuarioEnCacheBackend()
+
+    def test_usuario_y_perfil_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            usuario = self.backend.get_user(self.usuario.pk)
+            self.assertEqual(usuario.perfil.telefono, '')
+
+    def test_segunda_carga_sale_de_la_cache(self):
+        self.backend.get_user(self.usuario.pk)
+        with self.assertNumQueries(0):
+            usuario = self.backend.get_user(self.usuario.pk)
+            usuario.perfil.ciudad
+        self.assertEqual(usuario, self.usuario)
+
+    def test_guardar_usuario_o_perfil_invalida(self):
+        self.backend.get_user(self.usuario.pk)
+        perfil = PerfilUsuario.objects.get(usuario=self.usuario)
+        perfil.ciudad = "Montevideo"
+        perfil.save()
+        self.assertEqual(self.backend.get_user(self.usuario.pk).perfil.ciudad, "Montevideo")
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+
+    def test_update_necesita_invalidar_usuarios(self):
+        self.backend.get_user(self.usuario.pk)
+        User.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        # update() no envía post_save: el usuario sigue en la caché hasta invalidarlo
+        self.assertIsNotNone(self.backend.get_user(self.usuario.pk))
+        invalidar_usuarios([self.usuario.pk])
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+
+    def test_accion_desactivar_del_admin_invalida(self):
+        self.backend.get_user(self.usuario.pk)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123'))
+        response = self.client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'desactivar', '_selected_action': [self.usuario.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+
+    def test_sesiones_de_model_backend_siguen_valiendo(self):
+        # Sesión abierta antes de cambiar de backend: guarda la ruta de ModelBackend
+        self.client.force_login(self.usuario, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('perfil')).status_code, 200)
+
+    def test_las_sesiones_nuevas_usan_la_cache(self):
+        self.assertTrue(self.client.login(username='lectora', password='clave-segura-123'))
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'app_logos.autenticacion.UsuarioEnCacheBackend')
+
+
+@override_settings(PAGINAS_PRERENDERIZADAS_DIR=os.path.join(tempfile.gettempdir(), 'logos-sin-prerender'))
+class TiendaPaginadaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+        categoria = Categoria.objects.create(nombre="Cuentos")
+        cls.categoria = categoria
+        Libro.objects.bulk_create([
+            Libro(titulo=f"Cuento {i:02d}", autor=autor, categoria=categoria, descripcion="-", precio=10, stock=1)
+            for i in range(views.LIBROS_POR_PAGINA + 5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_la_tienda_muestra_una_pagina(self):
+        response = self.client.get(reverse('tienda'))
+        self.assertEqual(len(response.context['libros']), views.LIBROS_POR_PAGINA)
+        self.assertEqual(response.context['page_obj'].paginator.count, views.LIBROS_POR_PAGINA + 5)
+        self.assertContains(response, 'page=2">Siguiente')
+
+        segunda = self.client.get(reverse('tienda'), {'page': 2})
+        self.assertEqual(len(segunda.context['libros']), 5)
+
+    def test_los_enlaces_conservan_busqueda_y_categoria(self):
+        response = self.client.get(reverse('tienda'), {'q': 'Cuento', 'categoria': self.categoria.pk})
+        self.assertContains(response, f'?q=Cuento&categoria={self.categoria.pk}&page=2')
+
+
+class InsigniasEstadoTests(TestCase):
+    """mis_pedidos y los avisos en vivo usan la misma tabla de estados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave')
+        cls.orden = Orden.objects.create(
+            cliente=cls.cliente, total=100, subtotal=100, direccion_envio='Calle Falsa 123', estado='entregado',
+        )
+
+    def test_render_y_script_comparten_la_tabla(self):
+        self.client.force_login(self.cliente)
+        response = self.client.get(reverse('mis_pedidos'))
+        self.assertContains(response, '<span class="status-badge completed"><i class="bi bi-check-circle"></i> Entregado</span>', html=True)
+        tabla = json.loads(re.search(r'<script id="insignias-estado" type="application/json">(.*?)</script>', response.content.decode()).group(1))
+        self.assertEqual(tabla, {estado: list(insignia) for estado, insignia in INSIGNIAS.items()})
+        self.assertEqual(set(tabla), {estado for estado, _ in Orden.ESTADO_CHOICES})
+
+
+class DifusorConexionesTests(TestCase):
+
+    @override_settings(NOTIFICACIONES_INTERVALO=0)
+    async def test_sondeo_cierra_la_conexion_en_cada_vuelta(self):
+        difusor = notificaciones.Difusor()
+        difusor.suscripciones.add(notificaciones.Suscripcion(usuario_id=0, desde=0))
+
+        async def repartir():
+            # Una vuelta con error de base de datos y se desconectan todos
+            difusor.suscripciones.clear()
+            raise OperationalError("sin base")
+
+        with mock.patch.object(difusor, 'repartir', repartir), \
+                mock.patch.object(notificaciones, 'close_old_connections') as cerrar, \
+                self.assertLogs('app_logos.notificaciones', 'ERROR'):
+            await difusor.sondear()
+        cerrar.assert_called_once_with()
+
+
+class AlmacenamientoPorContenidoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Autor.objects.create(nombre="Autor", apellido="Prueba")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.almacen = AlmacenamientoPorContenido(location=media.name)
+        # También durante los on_commit de deduplicar_media, que corren al salir del bloque
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def archivos(self, directorio='libros'):
+        return sorted(os.listdir(os.path.join(self.media, directorio)))
+
+    def test_el_mismo_contenido_se_guarda_una_vez(self):
+        primero = self.almacen.save('libros/portada.JPEG', ContentFile(b'imagen'))
+        segundo = self.almacen.save('libros/otra.jpeg', ContentFile(b'imagen'))
+        self.assertEqual(primero, segundo)
+        self.assertTrue(es_nombre_por_contenido(primero))
+        self.assertTrue(primero.endswith('.jpg'))
+        self.assertEqual(self.archivos(), [os.path.basename(primero)])
+        self.assertNotEqual(self.almacen.save('libros/otra.jpg', ContentFile(b'otra imagen')), primero)
+
+    def test_carrera_entre_subidas_iguales(self):
+        nombre = self.almacen.save('libros/portada.jpg', ContentFile(b'imagen'))
+        # Las dos subidas pasaron por exists() antes de que la primera escribiera
+        with mock.patch.object(self.almacen, 'exists', return_value=False):
+            self.assertEqual(self.almacen.save('libros/portada.jpg', ContentFile(b'imagen')), nombre)
+            temporal = TemporaryUploadedFile('portada.jpg', 'image/jpeg', 6, None)
+            temporal.write(b'imagen')
+            self.assertEqual(self.almacen.save('libros/portada.jpg', temporal), nombre)
+        self.assertEqual(self.archivos(), [os.path.basename(nombre)])
+
+    def deduplicar(self, *opciones):
+        salida = StringIO()
+        call_command('deduplicar_media', *opciones, stdout=salida)
+        return salida.getvalue()
+
+    def preparar_portadas(self):
+        os.makedirs(os.path.join(self.media, 'libros'))
+        for nombre, contenido in (('a.jpg', b'igual'), ('b.jpg', b'igual'), ('c.jpg', b'distinta'), ('a.240w.webp', b'miniatura')):
+            with open(os.path.join(self.media, 'libros', nombre), 'wb') as archivo:
+                archivo.write(contenido)
+        for nombre in ('a', 'b', 'c'):
+            Libro.objects.create(titulo=nombre, autor=self.autor, descripcion="-", precio=10, stock=1, imagen=f'libros/{nombre}.jpg')
+
+    def test_deduplicar_renombra_y_borra_al_confirmar(self):
+        self.preparar_portadas()
+        with self.captureOnCommitCallbacks(execute=True):
+            salida = self.deduplicar()
+            # Antes de confirmar los originales siguen en disco
+            self.assertIn('a.jpg', self.archivos())
+        self.assertIn("3 portadas renombradas, 1 duplicados eliminados", salida)
+        imagenes = dict(Libro.objects.values_list('titulo', 'imagen'))
+        self.assertEqual(imagenes['a'], imagenes['b'])
+        self.assertNotEqual(imagenes['a'], imagenes['c'])
+        igual = os.path.basename(imagenes['a'])
+        self.assertEqual(self.archivos(), sorted([igual, igual.replace('.jpg', '.240w.webp'), os.path.basename(imagenes['c'])]))
+
+    def test_deduplicar_no_borra_nada_si_la_transaccion_falla(self):
+        self.preparar_portadas()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(OperationalError), transaction.atomic():
+                self.deduplicar()
+                raise OperationalError("falla al confirmar")
+        self.assertEqual(callbacks, [])
+        self.assertEqual(sorted(Libro.objects.values_list('imagen', flat=True)), ['libros/a.jpg', 'libros/b.jpg', 'libros/c.jpg'])
+        self.assertTrue({'a.jpg', 'b.jpg', 'c.jpg', 'a.240w.webp'} <= set(self.archivos()))
+
+    def test_dry_run(self):
+        self.preparar_portadas()
+        self.assertIn("Portadas a renombrar: 3 -> 2 archivos únicos.", self.deduplicar('--dry-run'))
+        self.assertEqual(self.archivos(), ['a.240w.webp', 'a.jpg', 'b.jpg', 'c.jpg'])
+
+
+class EstaticosTests(TestCase):
+
+    def test_minificar_quita_comentarios_y_espacios(self):
+        self.assertEqual(
+            minificar_css("/* cabecera */\nb > c ,\n d {\n  color : red ;\n  margin: 0 auto; }\n"),
+            "b>c,d{color : red;margin: 0 auto}",
+        )
+
+    def test_minificar_respeta_cadenas_y_url(self):
+        self.assertEqual(minificar_css('a::before { content: " : " ; }'), 'a::before{content: " : "}')
+        self.assertEqual(minificar_css("a { content: '/* no, ; */' /* sí */ ; }"), "a{content: '/* no, ; */'}")
+        self.assertEqual(minificar_css("e { font-family: 'Open  Sans', serif; }"), "e{font-family: 'Open  Sans',serif}")
+        self.assertEqual(
+            minificar_css('i { background: url(data:image/svg+xml;utf8,<svg> </svg>) ; }'),
+            'i{background: url(data:image/svg+xml;utf8,<svg> </svg>)}',
+        )
+        self.assertEqual(minificar_css('q { quotes: "\\"" ", "; }'), 'q{quotes: "\\"" ", "}')
+
+    @skipUnless(middleware.brotli, "Brotli no está instalado")
+    def test_post_process_escribe_las_variantes_comprimidas(self):
+        origen_dir, destino_dir = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(origen_dir.cleanup)
+        self.addCleanup(destino_dir.cleanup)
+        css = ''.join(f".regla-{i} {{ color: #{i:03d}; }}\n" for i in range(100))
+        os.makedirs(os.path.join(origen_dir.name, 'css'))
+        with open(os.path.join(origen_dir.name, 'css', 'estilo.css'), 'w') as archivo:
+            archivo.write(css)
+        origen = FileSystemStorage(location=origen_dir.name)
+        destino = EstaticosComprimidos(location=destino_dir.name, base_url='/static/')
+        with origen.open('css/estilo.css') as archivo:
+            destino.save('css/estilo.css', archivo)
+
+        list(destino.post_process({'css/estilo.css': (origen, 'css/estilo.css')}))
+        hasheado = destino.stored_name('css/estilo.css')
+        with destino.open(hasheado) as archivo:
+            minificado = archivo.read()
+        self.assertEqual(minificado, minificar_css(css).encode())
+        with destino.open(hasheado + '.gz') as archivo:
+            self.assertEqual(gzip.decompress(archivo.read()), minificado)
+        with destino.open(hasheado + '.br') as archivo:
+            self.assertEqual(middleware.brotli.decompress(archivo.read()), minificado)
+
+
+class GenerarDatosTests(TestCase):
+    ARGUMENTOS = ['--autores', '5', '--libros', '20', '--categorias', '2', '--subcategorias', '2', '--niveles', '2',
+                  '--usuarios', '10', '--ordenes', '50', '--lineas', '3', '--carritos', '4', '--lote', '7']
+
+    def generar(self, *argumentos):
+        call_command('generar_datos', *self.ARGUMENTOS, *argumentos, stdout=StringIO())
+
+    def datos(self):
+        # Sin pk ni contraseñas: los ids dependen de la secuencia y el hash lleva sal aleatoria
+        return {
+            'autores': list(Autor.objects.order_by('pk').values_list('nombre', 'apellido')),
+            'categorias': list(Categoria.objects.order_by('pk').values_list('nombre', 'slug', 'categoria_padre__slug')),
+            'libros': list(Libro.objects.order_by('pk').values_list(
+                'titulo', 'autor__apellido', 'categoria__slug', 'precio', 'stock', 'activo', 'fecha_creacion')),
+            'usuarios': list(User.objects.order_by('pk').values_list(
+                'username', 'first_name', 'last_name', 'date_joined', 'perfil__ciudad')),
+            'ordenes': list(Orden.objects.order_by('pk').values_list(
+                'cliente__username', 'fecha_orden', 'estado', 'subtotal', 'costo_envio', 'total')),
+            'lineas': list(DetalleOrden.objects.order_by('pk').values_list('libro__titulo', 'cantidad', 'subtotal')),
+            'carritos': list(Carrito.objects.order_by('pk').values_list('usuario__username', 'libro__titulo', 'cantidad')),
+        }
+
+    def test_genera_las_cantidades_pedidas(self):
+        self.generar()
+        self.assertEqual(Autor.objects.count(), 5)
+        self.assertEqual(Categoria.objects.count(), 2 + 2 * 2)
+        # Los libros cuelgan solo de las hojas del árbol
+        self.assertFalse(Libro.objects.filter(categoria__categoria_padre__isnull=True).exists())
+        self.assertEqual(Libro.objects.count(), 20)
+        self.assertEqual(User.objects.filter(username__startswith='datos_').count(), 10)
+        self.assertEqual(PerfilUsuario.objects.count(), 10)
+        self.assertEqual(Orden.objects.count(), 50)
+        self.assertTrue(50 <= DetalleOrden.objects.count() <= 150)
+        self.assertFalse(Orden.objects.filter(detalles__isnull=True).exists())
+        self.assertEqual(Carrito.objects.values('usuario').distinct().count(), 4)
+
+    def test_misma_semilla_mismos_datos(self):
+        corridas = []
+        instante = timezone.now()
+        for _ in range(2):
+            with transaction.atomic(), mock.patch('django.utils.timezone.now', return_value=instante):
+                self.generar('--semilla', '7')
+                corridas.append(self.datos())
+                transaction.set_rollback(True)
+        self.assertEqual(corridas[0], corridas[1])
+        self.assertEqual(len(corridas[0]['ordenes']), 50)
+
+    def test_rechaza_una_segunda_corrida(self):
+        self.generar()
+        with self.assertRaisesMessage(CommandError, "usuarios 'datos_*'"):
+            self.generar()
+        self.assertEqual(Libro.objects.count(), 20)
+
+    def test_rechaza_categorias_de_una_corrida_fallida(self):
+        Categoria.objects.create(nombre="Novela 1", slug="datos-1")
+        with self.assertRaisesMessage(CommandError, "categorías 'datos-*'"):
+            self.generar()
+        self.assertFalse(Libro.objects.exists())
+
+
+# Tamaño del conjunto de datos relativo a los valores por defecto de generar_datos
+# (1 = 100k libros y 1M de órdenes; el valor por defecto deja la suite en segundos)
+BENCHMARK_ESCALA = float(os.environ.get('BENCHMARK_ESCALA', 0.002))
+BENCHMARK_REPETICIONES = int(os.environ.get('BENCHMARK_REPETICIONES', 5))
+# Cuánto puede empeorar la latencia p50 y la memoria pico respecto a la línea base
+BENCHMARK_TOLERANCIA = float(os.environ.get('BENCHMARK_TOLERANCIA', 2.0))
+# Margen absoluto para que el ruido en vistas de pocos milisegundos no cuente como regresión
+MARGEN_MS = 10
+MARGEN_KB = 512
+
+BENCHMARK_BASE = Path(__file__).with_name('benchmark_base.json')
+BENCHMARK_REPORTE = Path(os.environ.get('BENCHMARK_REPORTE', settings.BASE_DIR / 'benchmark' / 'reporte.json'))
+
+# argumentos: tupla para reverse() o función que prepara el estado (sin medirse) y la devuelve
+Ruta = namedtuple('Ruta', ['cliente', 'metodo', 'argumentos', 'datos', 'estado'], defaults=['get', (), None, 200])
+
+
+def percentil(valores, p):
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def regresiones(base, actual):
+    """
+    Compara dos reportes y devuelve una línea por cada vista que empeoró:
+    más consultas que en la base (sin tolerancia: dependen solo del código
+    y de los datos), o latencia p50 / memoria pico por encima de la tolerancia.
+    El p95 se reporta pero no se compara: con pocas repeticiones es casi el
+    máximo y una sola pausa del sistema lo dispara.
+    """
+    encontradas = []
+    for nombre, medida in actual['vistas'].items():
+        anterior = base['vistas'].get(nombre)
+        if anterior is None:
+            continue
+        if medida['consultas'] > anterior['consultas']:
+            encontradas.append(f"{nombre}: {medida['consultas']} consultas (base {anterior['consultas']})")
+        limite = anterior['p50_ms'] * BENCHMARK_TOLERANCIA + MARGEN_MS
+        if medida['p50_ms'] > limite:
+            encontradas.append(f"{nombre}: p50 {medida['p50_ms']} ms (base {anterior['p50_ms']} ms, límite {limite:.1f} ms)")
+        limite = anterior['memoria_kb'] * BENCHMARK_TOLERANCIA + MARGEN_KB
+        if medida['memoria_kb'] > limite:
+            encontradas.append(f"{nombre}: {medida['memoria_kb']} KB de memoria pico (base {anterior['memoria_kb']} KB)")
+    return encontradas
+
+
+@tag('benchmark')
+@override_settings(
+    PAGINAS_PRERENDERIZADAS_DIR=settings.BASE_DIR / 'benchmark' / 'sin-paginas',
+    PERFILES_DIR=settings.BASE_DIR / 'benchmark' / 'perfiles',
+)
+class RendimientoVistasTests(TestCase):
+    """
+    Recorre todas las rutas de app_logos/urls.py con el cliente de pruebas
+    sobre datos de `manage.py generar_datos`, mide latencia p50/p95, número
+    de consultas y memoria pico de cada vista, escribe el reporte en
+    BENCHMARK_REPORTE y falla si alguna vista empeoró respecto a
+    benchmark_base.json.
+
+    Cada petición se mide con las cachés vacías (el peor caso) y un cliente
+    nuevo, para que cookies de mensajes o sesiones anteriores no cambien el
+    resultado. Solo la suite: `manage.py test app_logos --tag benchmark`.
+    Para guardar una nueva línea base: BENCHMARK_ACTUALIZAR=1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        tamanos = {'libros': 100_000, 'autores': 10_000, 'usuarios': 50_000, 'ordenes': 1_000_000, 'carritos': 5_000}
+        argumentos = []
+        for opcion, tamano in tamanos.items():
+            argumentos += [f'--{opcion}', str(max(1, int(tamano * BENCHMARK_ESCALA)))]
+        call_command('generar_datos', *argumentos, stdout=StringIO())
+
+        # El cliente con más pedidos: el peor caso de mis_pedidos
+        cls.cliente = User.objects.annotate(num=Count('ordenes')).order_by('-num', 'id').first()
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave-segura-123', is_staff=True)
+        cls.orden = cls.cliente.ordenes.order_by('-fecha_orden').first()
+        cls.libros = list(Libro.objects.filter(activo=True).order_by('id')[:5])
+        cls.libro = cls.libros[0]
+
+    def setUp(self):
+        self.llenar_carrito()
+
+    def llenar_carrito(self):
+        for libro in self.libros[:3]:
+            Carrito.objects.get_or_create(usuario=self.cliente, libro=libro, defaults={'cantidad': 1})
+        return ()
+
+    def item_carrito(self):
+        item, _ = Carrito.objects.get_or_create(usuario=self.cliente, libro=self.libros[4], defaults={'cantidad': 1})
+        return (item.pk,)
+
+    def perfil_guardado(self):
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+        perfilador.disable()
+        return (perfilado.guardar_perfil(perfilador),)
+
+    def rutas(self):
+        libro, orden = self.libro.pk, self.orden.pk
+        item = Carrito.objects.filter(usuario=self.cliente).first().pk
+        checkout = {
+            'direccion_envio': 'Calle Falsa 123', 'ciudad': 'Puebla', 'codigo_postal': '72000',
+            'banco_tarjeta': 'BBVA', 'nombre_tarjeta': 'Cliente Prueba', 'numero_tarjeta': '4111111111111111',
+            'fecha_exp': '12/30', 'cvv': '123',
+        }
+        return {
+            'inicio': Ruta('anonimo'),
+            'tienda': Ruta('anonimo'),
+            'sobre_nosotros': Ruta('anonimo'),
+            'contacto': Ruta('anonimo'),
+            'estado_sesion': Ruta('usuario'),
+            'registro': Ruta('anonimo'),
+            'login': Ruta('anonimo'),
+            'logout': Ruta('usuario', estado=302),
+            'perfil': Ruta('usuario'),
+            'carrito': Ruta('usuario'),
+            'agregar_al_carrito': Ruta('usuario', argumentos=(libro,), estado=302),
+            'actualizar_carrito': Ruta('usuario', 'post', (item,), {'cantidad': 2}, estado=302),
+            'eliminar_del_carrito': Ruta('usuario', argumentos=self.item_carrito, estado=302),
+            'checkout': Ruta('usuario', 'post', self.llenar_carrito, checkout, estado=302),
+            'mis_pedidos': Ruta('usuario'),
+            'detalle_pedido': Ruta('usuario', argumentos=(orden,)),
+            'confirmacion_compra': Ruta('usuario', argumentos=(orden,)),
+            'admin_productos': Ruta('staff'),
+            'agregar_producto': Ruta('staff'),
+            'importar_productos': Ruta('staff'),
+            'ajustar_catalogo': Ruta('staff'),
+            'editar_producto': Ruta('staff', argumentos=(libro,)),
+            # Solo la confirmación: borrar cambiaría los datos de las demás vistas
+            'eliminar_producto': Ruta('staff', argumentos=(libro,)),
+            'admin_pedidos': Ruta('staff'),
+            'exportar_pedidos_csv': Ruta('staff'),
+            'admin_usuarios': Ruta('staff'),
+            'cambiar_estado_pedido': Ruta('staff', 'post', (orden,), {'estado': 'enviado'}, estado=302),
+            'cambiar_estado_pedidos': Ruta('staff', 'post', datos={'estado': 'enviado', 'pedidos': [orden]}, estado=302),
+            'eventos_pedidos': Ruta('usuario'),
+            'descargar_perfil': Ruta('staff', argumentos=self.perfil_guardado),
+            'metricas': Ruta('staff'),
+            'consultas_lentas': Ruta('staff'),
+        }
+
+    def peticion(self, nombre, ruta):
+        # Nada de esto se mide: cachés vacías, cliente nuevo y estado que necesita la ruta
+        cache.clear()
+        cliente = Client()
+        if ruta.cliente != 'anonimo':
+            cliente.force_login(self.cliente if ruta.cliente == 'usuario' else self.admin)
+        argumentos = ruta.argumentos() if callable(ruta.argumentos) else ruta.argumentos
+        url = reverse(nombre, args=argumentos)
+        enviar = getattr(cliente, ruta.metodo)
+
+        def ejecutar():
+            response = enviar(url, ruta.datos) if ruta.datos else enviar(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        return ejecutar
+
+    def medir(self, nombre, ruta):
+        consultas = []
+
+        def contar(execute, sql, params, many, context):
+            consultas[-1] += 1
+            return execute(sql, params, many, context)
+
+        tiempos = []
+        # La primera vuelta calienta plantillas y URLs compiladas y no se cuenta
+        for vuelta in range(BENCHMARK_REPETICIONES + 1):
+            ejecutar = self.peticion(nombre, ruta)
+            consultas.append(0)
+            gc.collect()
+            with connection.execute_wrapper(contar):
+                inicio = time.perf_counter()
+                response = ejecutar()
+                duracion = time.perf_counter() - inicio
+            self.assertEqual(response.status_code, ruta.estado, nombre)
+            if vuelta:
+                tiempos.append(duracion * 1000)
+
+        # tracemalloc frena mucho la ejecución: la memoria se mide en una vuelta aparte
+        ejecutar = self.peticion(nombre, ruta)
+        tracemalloc.start()
+        try:
+            ejecutar()
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'consultas': max(consultas[1:]),
+            'memoria_kb': pico // 1024,
+        }
+
+    def test_todas_las_rutas_tienen_benchmark(self):
+        nombres = {patron.name for patron in urls.urlpatterns}
+        self.assertEqual(nombres - set(self.rutas()), set(), "Rutas sin entrada en RendimientoVistasTests.rutas()")
+
+    def test_rendimiento_vistas(self):
+        reporte = {
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'escala': BENCHMARK_ESCALA,
+            'repeticiones': BENCHMARK_REPETICIONES,
+            'vistas': {nombre: self.medir(nombre, ruta) for nombre, ruta in self.rutas().items()},
+        }
+        BENCHMARK_REPORTE.parent.mkdir(parents=True, exist_ok=True)
+        BENCHMARK_REPORTE.write_text(json.dumps(reporte, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+        if os.environ.get('BENCHMARK_ACTUALIZAR'):
+            BENCHMARK_BASE.write_text(json.dumps(reporte, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            return
+        if not BENCHMARK_BASE.exists():
+            self.skipTest(f"Sin línea base; se genera con BENCHMARK_ACTUALIZAR=1 (reporte en {BENCHMARK_REPORTE})")
+        base = json.loads(BENCHMARK_BASE.read_text(encoding='utf-8'))
+        if base['escala'] != BENCHMARK_ESCALA:
+            self.skipTest(f"La línea base es de escala {base['escala']}; solo se compara con la misma escala")
+
+        encontradas = regresiones(base, reporte)
+        self.assertFalse(encontradas, "Regresiones de rendimiento:\n" + "\n".join(encontradas))
+
+
+@override_settings(NOTIFICACIONES_INTERVALO=3600)
+class AvisosPedidosTests(TestCase):
+    """Cambios de estado que llegan a los clientes por SSE (app_logos/notificaciones.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = User.objects.create_user('cliente', 'cliente@example.com', 'clave')
+        cls.otro = User.objects.create_user('otro', 'otro@example.com', 'clave')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'clave', is_staff=True)
+        datos = {'total': 100, 'subtotal': 100, 'direccion_envio': 'Calle Falsa 123', 'estado': 'pagado'}
+        cls.ordenes = [Orden.objects.create(cliente=cls.cliente, **datos) for _ in range(3)]
+        cls.ajena = Orden.objects.create(cliente=cls.otro, **datos)
+
+    def test_cambio_en_lote_publica_un_evento_por_orden(self):
+        self.client.force_login(self.admin)
+        ids = [orden.pk for orden in self.ordenes]
+        # Las mismas consultas con 3 órdenes que con 300: sesión, SELECT, UPDATE, INSERT y limpieza
+        with self.assertNumQueries(7):
+            self.client.post(reverse('cambiar_estado_pedidos'), {'estado': 'enviado', 'pedidos': ids})
+        self.assertEqual(Orden.objects.filter(pk__in=ids, estado='enviado').count(), 3)
+        self.assertEqual(sorted(EventoPedido.objects.values_list('orden_id', flat=True)), ids)
+
+    def test_flujo_con_wsgi_devuelve_lo_pendiente_desde_last_event_id(self):
+        Orden.objects.filter(pk=self.ordenes[0].pk).update(estado='enviado')
+        notificaciones.publicar([Orden.objects.get(pk=self.ordenes[0].pk), Orden.objects.get(pk=self.ajena.pk)])
+        self.client.force_login(self.cliente)
+
+        response = self.client.get(reverse('eventos_pedidos'), HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = b''.join(response.streaming_content).decode()
+        self.assertIn('retry: ', contenido)
+        datos = json.loads(re.search(r'^data: (.*)$', contenido, re.MULTILINE).group(1))
+        self.assertEqual(datos, [{'pedido': self.ordenes[0].pk, 'estado': 'enviado', 'estado_display': 'Enviado'}])
+
+        # Sin Last-Event-ID solo cuenta lo que pase desde ahora
+        contenido = b''.join(self.client.get(reverse('eventos_pedidos')).streaming_content).decode()
+        self.assertNotIn('data:', contenido)
+
+    async def test_last_event_id_se_acota_a_los_eventos_retenidos(self):
+        await sync_to_async(notificaciones.publicar)(self.ordenes)
+        # Lo que habría borrado la limpieza por antigüedad
+        primero = await EventoPedido.objects.order_by('id').values_list('id', flat=True).afirst()
+        await EventoPedido.objects.filter(pk=primero).adelete()
+        ultimo = await notificaciones.ultimo_id()
+
+        self.assertEqual(await notificaciones.punto_de_partida(None), ultimo)
+        self.assertEqual(await notificaciones.punto_de_partida(0), primero)
+        self.assertEqual(await notificaciones.punto_de_partida(ultimo - 1), ultimo - 1)
+        self.assertEqual(await notificaciones.punto_de_partida(ultimo + 1000), ultimo)
+
+        # Con la tabla vacía cualquier evento nuevo es posterior
+        await EventoPedido.objects.all().adelete()
+        self.assertEqual(await notificaciones.punto_de_partida(0), 0)
+
+    async def test_difusor_reparte_un_lote_por_usuario(self):
+        difusor = notificaciones.Difusor()
+        desde = await notificaciones.ultimo_id()
+        mia = difusor.suscribir(self.cliente.pk, desde)
+        ajena = difusor.suscribir(self.otro.pk, desde)
+        try:
+            orden = self.ordenes[0]
+            for estado in ('enviado', 'entregado'):
+                orden.estado = estado
+                await sync_to_async(notificaciones.publicar)([orden])
+            await difusor.repartir()
+        finally:
+            difusor.cancelar(mia)
+            difusor.cancelar(ajena)
+            difusor.tarea.cancel()
+
+        lote = mia.cola.get_nowait()
+        self.assertEqual(len(lote), 2)
+        self.assertTrue(ajena.cola.empty())
+        # El mensaje solo lleva el último estado de cada orden
+        self.assertIn(f'"pedido": {orden.pk}, "estado": "entregado"', notificaciones.mensaje(lote))
+        self.assertEqual(ajena.desde, lote[-1]['id'])
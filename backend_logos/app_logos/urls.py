@@ -8,6 +8,7 @@ urlpatterns = [
     path('tienda/', views.tienda, name='tienda'),
     path('sobre-nosotros/', views.sobre_nosotros, name='sobre_nosotros'),
     path('contacto/', views.contacto, name='contacto'),
+    path('sesion/estado/', views.estado_sesion, name='estado_sesion'),
     
     # Usuarios y Perfil
     path('registro/', views.registro, name='registro'),
@@ -25,17 +26,27 @@ urlpatterns = [
     # Órdenes de Usuario
     path('mis-pedidos/', views.mis_pedidos, name='mis_pedidos'),
     path('pedido/<int:pedido_id>/', views.detalle_pedido, name='detalle_pedido'),
+    path('pedidos/eventos/', views.eventos_pedidos, name='eventos_pedidos'),
     path('confirmacion-compra/<int:pedido_id>/', views.confirmacion_compra, name='confirmacion_compra'),
     
     # --- RUTAS DE ADMINISTRACIÓN DE PRODUCTOS ---
     path('admin/productos/', views.admin_productos, name='admin_productos'),
     path('admin/productos/agregar/', views.agregar_producto, name='agregar_producto'),
+    path('admin/productos/importar/', views.importar_productos, name='importar_productos'),
+    path('admin/productos/ajustar/', views.ajustar_catalogo, name='ajustar_catalogo'),
     path('admin/productos/editar/<int:pk>/', views.editar_producto, name='editar_producto'),
     path('admin/productos/eliminar/<int:pk>/', views.eliminar_producto, name='eliminar_producto'),
 
     # --- RUTAS DE ADMINISTRACIÓN DE PEDIDOS Y USUARIOS ---
     path('admin/pedidos/', views.admin_pedidos, name='admin_pedidos'),
+    path('admin/pedidos/exportar/', views.exportar_pedidos_csv, name='exportar_pedidos_csv'),
     path('admin/usuarios/', views.admin_usuarios, name='admin_usuarios'),
+    path('admin/pedidos/cambiar-estado/', views.cambiar_estado_pedidos, name='cambiar_estado_pedidos'),
     path('admin/pedidos/cambiar-estado/<int:pedido_id>/', views.cambiar_estado_pedido, name='cambiar_estado_pedido'),
+    path('admin/perfiles/<uuid:perfil_id>/', views.descargar_perfil, name='descargar_perfil'),
+    path('admin/consultas-lentas/', views.consultas_lentas, name='consultas_lentas'),
+
+    # Métricas para Prometheus
+    path('metrics', views.metricas, name='metricas'),
 
 ]
@@ -4,12 +4,35 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
-from django.db.models import Q
-from .models import Libro, Categoria, Autor, PerfilUsuario, Carrito, Orden, DetalleOrden
-from .forms import RegistroForm
+from django.db import transaction
+from django.db.models import F, Q, ProtectedError, Count, Sum, Max, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import etag
+from django.views.static import serve
+from django.conf import settings
+from .models import Libro, Categoria, Autor, PerfilUsuario, Carrito, Orden, DetalleOrden, OrdenArchivada, DetalleOrdenArchivado, ConsultaLenta
+from .forms import RegistroForm, LibroForm, ImportarCatalogoForm, AjusteCatalogoForm
+from .catalogo import filtrar_libros, ajustar_libros
+from .cache_paginas import cache_anonimo, etag_pagina
+from .storage import es_nombre_por_contenido
+from .importacion import ImportadorCatalogo, leer_filas
+from .perfilado import ruta_perfil
+from . import metricas as metricas_tienda
+from . import notificaciones
 import uuid
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+import csv
 import re
+import time
+from datetime import datetime, timedelta
+from heapq import merge
 
 # ========== DECORADOR DE ADMINISTRADOR ==========
 def es_administrador(user):
@@ -18,8 +41,13 @@ def es_administrador(user):
 admin_required = user_passes_test(es_administrador, login_url='inicio')
 
 # ========== VISTAS PRINCIPALES DE LA TIENDA ==========
+# Libros por página en la tienda: con el catálogo completo la página crecía sin límite
+LIBROS_POR_PAGINA = 24
+
+@etag(etag_pagina)
+@cache_anonimo
 def inicio(request):
-    libros_destacados = Libro.objects.filter(destacado=True, activo=True)[:8]
+    libros_destacados = Libro.objects.filter(destacado=True, activo=True).order_by('-fecha_creacion')[:8]
     categorias = Categoria.objects.filter(activa=True)
     context = {
         'libros_destacados': libros_destacados,
@@ -27,10 +55,13 @@ def inicio(request):
     }
     return render(request, 'app_logos/pages/inicio.html', context)
 
+@etag(etag_pagina)
+@cache_anonimo
 def tienda(request):
     query = request.GET.get('q', '')
     categoria_id = request.GET.get('categoria', '')
-    libros = Libro.objects.filter(activo=True)
+    # Los más recientes primero; el orden coincide con los índices parciales de Libro
+    libros = Libro.objects.filter(activo=True).order_by('-fecha_creacion')
     if query:
         libros = libros.filter(
             Q(titulo__icontains=query) |
@@ -41,22 +72,60 @@ def tienda(request):
     if categoria_id:
         libros = libros.filter(categoria_id=categoria_id)
     categorias = Categoria.objects.filter(activa=True)
+
+    paginator = Paginator(libros, LIBROS_POR_PAGINA)
+    inicio = time.perf_counter()
+    # Conteo y página de resultados: lo que cuesta la búsqueda
+    page_obj = paginator.get_page(request.GET.get('page'))
+    libros = list(page_obj)
+    if query:
+        metricas_tienda.busqueda_segundos.observe(time.perf_counter() - inicio)
     context = {
         'libros': libros,
+        'page_obj': page_obj,
         'categorias': categorias,
         'query': query,
+        'categoria_id': categoria_id,
     }
     return render(request, 'app_logos/pages/tienda.html', context)
 
+@etag(etag_pagina)
+@cache_anonimo
 def sobre_nosotros(request):
     return render(request, 'app_logos/pages/sobre_nosotros.html')
 
+@etag(etag_pagina)
+@cache_anonimo
 def contacto(request):
     if request.method == 'POST':
         messages.success(request, '¡Mensaje enviado! Te contactaremos pronto.')
         return redirect('contacto')
     return render(request, 'app_logos/pages/contacto.html')
 
+@never_cache
+def estado_sesion(request):
+    """
+    Lo que una página cacheada no puede traer: el token CSRF del visitante
+    y el número de artículos en su carrito.
+    """
+    if request.user.is_authenticated:
+        num_items = Carrito.objects.filter(usuario=request.user).aggregate(total=Sum('cantidad'))['total'] or 0
+    else:
+        num_items = 0
+    return JsonResponse({
+        'autenticado': request.user.is_authenticated,
+        'num_items_carrito': num_items,
+        'csrf_token': get_token(request),
+    })
+
+def servir_media(request, path):
+    # Archivos subidos en desarrollo. Los nombrados por contenido nunca cambian, así que
+    # se marcan como inmutables; en producción el servidor web debe enviar la misma cabecera.
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if es_nombre_por_contenido(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 # ========== GESTIÓN DE USUARIOS Y AUTENTICACIÓN ==========
 
 def registro(request):
@@ -98,7 +167,11 @@ def logout_view(request):
 
 @login_required
 def perfil(request):
-    perfil, created = PerfilUsuario.objects.get_or_create(usuario=request.user)
+    # UsuarioEnCacheBackend ya trajo el perfil junto con el usuario
+    try:
+        perfil = request.user.perfil
+    except PerfilUsuario.DoesNotExist:
+        perfil = PerfilUsuario.objects.create(usuario=request.user)
     if request.method == 'POST':
         perfil.telefono = request.POST.get('telefono', '')
         perfil.direccion_envio = request.POST.get('direccion_envio', '')
@@ -174,6 +247,7 @@ def checkout(request):
 
     items_carrito = Carrito.objects.filter(usuario=request.user)
     if not items_carrito:
+        metricas_tienda.checkout.labels('carrito_vacio').inc()
         messages.warning(request, 'Tu carrito está vacío.')
         return redirect('tienda')
 
@@ -199,6 +273,7 @@ def checkout(request):
     if not re.match(r'^\d{3,4}$', cvv): errors.append('El CVV debe tener 3 o 4 dígitos.')
 
     if errors:
+        metricas_tienda.checkout.labels('datos_invalidos').inc()
         for error in errors:
             messages.error(request, error)
         # Aquí recargamos el contexto necesario para volver a renderizar el carrito
@@ -246,17 +321,25 @@ def checkout(request):
     
     items_carrito.delete()
     
+    metricas_tienda.checkout.labels('exito').inc()
     return redirect('confirmacion_compra', pedido_id=orden.id)
 
 @login_required
 def mis_pedidos(request):
     pedidos = request.user.ordenes.all().order_by('-fecha_orden')
-    return render(request, 'app_logos/pedidos/mis_pedidos.html', {'pedidos': pedidos})
+    # Las movidas por archivar_pedidos siguen siendo del cliente: se listan aparte, sin detalle
+    anteriores = request.user.ordenes_archivadas.only('id', 'fecha_orden', 'estado', 'total').order_by('-fecha_orden')
+    return render(request, 'app_logos/pedidos/mis_pedidos.html', {'pedidos': pedidos, 'pedidos_anteriores': anteriores})
 
 @login_required
 def detalle_pedido(request, pedido_id):
-    pedido = get_object_or_404(Orden, id=pedido_id, cliente=request.user)
-    return render(request, 'app_logos/pedidos/detalle_pedido.html', {'pedido': pedido})
+    pedido = Orden.objects.filter(id=pedido_id, cliente=request.user).first()
+    if pedido is None:
+        # Las órdenes antiguas pueden haberse movido al archivo (comando archivar_pedidos)
+        pedido = get_object_or_404(OrdenArchivada, id=pedido_id, cliente=request.user)
+    # Una orden archivada ya no cambia de estado: su página no abre el flujo SSE
+    archivado = isinstance(pedido, OrdenArchivada)
+    return render(request, 'app_logos/pedidos/detalle_pedido.html', {'pedido': pedido, 'archivado': archivado})
 
 @login_required
 def confirmacion_compra(request, pedido_id):
@@ -273,15 +356,97 @@ def admin_productos(request):
 
 @admin_required
 def agregar_producto(request):
-    pass
+    if request.method == 'POST':
+        form = LibroForm(request.POST, request.FILES)
+        if form.is_valid():
+            libro = form.save()
+            messages.success(request, f'"{libro.titulo}" fue agregado al catálogo.')
+            return redirect('admin_productos')
+        for errores in form.errors.values():
+            for error in errores:
+                messages.error(request, error)
+    else:
+        form = LibroForm()
+    return render(request, 'app_logos/productos/agregar_producto.html', {
+        'form': form,
+        'categorias': Categoria.objects.filter(activa=True),
+    })
 
 @admin_required
 def editar_producto(request, pk):
-    pass
+    producto = get_object_or_404(Libro.objects.select_related('autor', 'categoria'), pk=pk)
+    if request.method == 'POST':
+        form = LibroForm(request.POST, request.FILES, instance=producto)
+        if form.is_valid():
+            form.save()
+            messages.success(request, f'"{producto.titulo}" fue actualizado.')
+            return redirect('admin_productos')
+        for errores in form.errors.values():
+            for error in errores:
+                messages.error(request, error)
+    else:
+        form = LibroForm(instance=producto)
+    return render(request, 'app_logos/productos/editar_producto.html', {
+        'form': form,
+        'producto': producto,
+        'categorias': Categoria.objects.filter(activa=True),
+    })
 
 @admin_required
 def eliminar_producto(request, pk):
-    pass
+    producto = get_object_or_404(Libro.objects.select_related('autor', 'categoria'), pk=pk)
+    if request.method == 'POST':
+        titulo = producto.titulo
+        try:
+            producto.delete()
+            messages.success(request, f'"{titulo}" fue eliminado del catálogo.')
+        except ProtectedError:
+            # Los libros con pedidos no se pueden borrar (DetalleOrden los protege); se ocultan de la tienda
+            producto.activo = False
+            producto.save(update_fields=['activo'])
+            messages.warning(request, f'"{titulo}" tiene pedidos registrados, así que se desactivó en lugar de eliminarse.')
+        return redirect('admin_productos')
+    return render(request, 'app_logos/productos/eliminar_producto.html', {'producto': producto})
+
+@admin_required
+def importar_productos(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarCatalogoForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resultado = ImportadorCatalogo().importar(leer_filas(archivo.file, archivo.name))
+            except ValueError as error:
+                # El archivo se lee mientras se importa: un JSON roto a la mitad deshace todo
+                messages.error(request, f'No se pudo leer el archivo, no se importó nada: {error}')
+            else:
+                messages.success(request, f'Importación terminada: {resultado.creados} libros creados y {resultado.actualizados} actualizados.')
+                if resultado.errores:
+                    messages.warning(request, f'{len(resultado.errores)} filas se omitieron por errores.')
+    else:
+        form = ImportarCatalogoForm()
+    return render(request, 'app_logos/productos/importar_productos.html', {
+        'form': form,
+        'resultado': resultado,
+    })
+
+@admin_required
+def ajustar_catalogo(request):
+    if request.method == 'POST':
+        form = AjusteCatalogoForm(request.POST)
+        if form.is_valid():
+            libros = filtrar_libros(
+                categorias=[categoria.id for categoria in form.cleaned_data['categorias']],
+                autores=form.cleaned_data['autores'],
+                ids=form.cleaned_data['ids'],
+            )
+            modificados = ajustar_libros(libros, **form.ajustes())
+            messages.success(request, f'Se actualizaron {modificados} libros.')
+            return redirect('ajustar_catalogo')
+    else:
+        form = AjusteCatalogoForm()
+    return render(request, 'app_logos/productos/ajustar_catalogo.html', {'form': form})
 
 # ========== PANELES DE ADMINISTRACIÓN ADICIONALES (SOLO ADMINS) ==========
 
@@ -290,17 +455,156 @@ def admin_pedidos(request):
     pedidos = Orden.objects.all().order_by('-fecha_orden')
     return render(request, 'app_logos/pedidos/admin_pedidos.html', {
         'pedidos': pedidos,
+        'estados': Orden.ESTADO_CHOICES,
         'titulo': 'Administrar Pedidos'
     })
 
+ORDEN_USUARIOS = {
+    'registro': 'usuario__date_joined',
+    'pedidos': 'num_pedidos',
+    'gastado': 'total_gastado',
+    'ultimo': 'ultimo_pedido',
+}
+
 @admin_required
 def admin_usuarios(request):
-    perfiles = PerfilUsuario.objects.all().select_related('usuario')
+    # Número de pedidos, total gastado y último pedido en una sola consulta agrupada
+    perfiles = PerfilUsuario.objects.select_related('usuario').annotate(
+        num_pedidos=Count('usuario__ordenes'),
+        total_gastado=Coalesce(Sum('usuario__ordenes__total'), Value(0), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        ultimo_pedido=Max('usuario__ordenes__fecha_orden'),
+    )
+
+    orden = request.GET.get('orden', '-registro')
+    campo = ORDEN_USUARIOS.get(orden.lstrip('-'))
+    if campo is None:
+        orden, campo = '-registro', ORDEN_USUARIOS['registro']
+    if orden.startswith('-'):
+        perfiles = perfiles.order_by(F(campo).desc(nulls_last=True), '-id')
+    else:
+        perfiles = perfiles.order_by(F(campo).asc(nulls_first=True), 'id')
+
+    paginator = Paginator(perfiles, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
     return render(request, 'app_logos/usuarios/admin_usuarios.html', {
-        'perfiles': perfiles,
+        'perfiles': page_obj,
+        'page_obj': page_obj,
+        'orden': orden,
         'titulo': 'Administrar Usuarios'
     })
 
+class Echo:
+    """
+    Objeto tipo archivo que solo devuelve lo que se le escribe, para que
+    csv.writer genere cada fila sin acumularla en memoria.
+    """
+    def write(self, value):
+        return value
+
+def _parse_fecha(valor):
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
+
+def _inicio_del_dia(fecha):
+    # Límite en hora local como datetime: a diferencia de __date, permite usar el índice de fecha_orden
+    return timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
+
+def _filas_exportacion_pedidos(ordenes):
+    writer = csv.writer(Echo())
+    yield writer.writerow([
+        'Pedido', 'Fecha', 'Cliente', 'Email', 'Estado', 'Método de pago', 'Banco',
+        'Subtotal pedido', 'Envío', 'Total pedido',
+        'Libro ID', 'Libro', 'Cantidad', 'Precio unitario', 'Subtotal línea',
+    ])
+    for orden, detalles in ordenes:
+        cliente = orden.cliente
+        datos_orden = [
+            orden.id,
+            timezone.localtime(orden.fecha_orden).strftime('%Y-%m-%d %H:%M:%S'),
+            cliente.username if cliente else '',
+            cliente.email if cliente else '',
+            orden.estado,
+            orden.metodo_pago,
+            orden.banco_tarjeta,
+            orden.subtotal,
+            orden.costo_envio,
+            orden.total,
+        ]
+        if not detalles:
+            # Un pedido sin líneas también se exporta, con las columnas de línea vacías
+            yield writer.writerow(datos_orden + [''] * 5)
+        for detalle in detalles:
+            yield writer.writerow(datos_orden + [
+                detalle.libro_id,
+                detalle.libro.titulo,
+                detalle.cantidad,
+                detalle.precio_unidad,
+                detalle.subtotal,
+            ])
+
+def _ordenes_exportacion(modelo, modelo_detalle, desde, hasta, estado, lote=500):
+    """
+    Pares (pedido, líneas) en orden cronológico, por lotes: una consulta de
+    pedidos y otra de sus líneas cada `lote` pedidos, así la memoria no crece
+    con el número de pedidos y el primer byte sale de inmediato. Se agrupan
+    a mano porque prefetch_related guarda un QuerySet por pedido.
+    """
+    # Solo las columnas del CSV: la dirección y la descripción del libro son texto libre.
+    # Orden por fecha, que siguen los índices: por id SQLite ordenaría todo antes de empezar.
+    ordenes = modelo.objects.select_related('cliente').defer('direccion_envio').only(
+        *(campo.name for campo in modelo._meta.concrete_fields if campo.name != 'direccion_envio'),
+        'cliente__username', 'cliente__email',
+    ).order_by('fecha_orden')
+    if desde:
+        ordenes = ordenes.filter(fecha_orden__gte=_inicio_del_dia(desde))
+    if hasta:
+        ordenes = ordenes.filter(fecha_orden__lt=_inicio_del_dia(hasta + timedelta(days=1)))
+    if estado in dict(Orden.ESTADO_CHOICES):
+        ordenes = ordenes.filter(estado=estado)
+
+    pendientes = []
+    for orden in ordenes.iterator(chunk_size=lote):
+        pendientes.append(orden)
+        if len(pendientes) == lote:
+            yield from _con_detalles(pendientes, modelo_detalle)
+            pendientes = []
+    yield from _con_detalles(pendientes, modelo_detalle)
+
+def _con_detalles(ordenes, modelo_detalle):
+    if not ordenes:
+        return
+    detalles = {}
+    for detalle in modelo_detalle.objects.filter(orden_id__in=[orden.id for orden in ordenes]).select_related('libro').only(
+        'orden_id', 'libro__titulo', 'cantidad', 'precio_unidad', 'subtotal',
+    ).order_by('id'):
+        detalles.setdefault(detalle.orden_id, []).append(detalle)
+    for orden in ordenes:
+        yield orden, detalles.get(orden.id, [])
+
+@admin_required
+def exportar_pedidos_csv(request):
+    # Una fila por línea de pedido, en orden cronológico. El archivo (archivar_pedidos) y
+    # los pedidos activos se solapan en el tiempo (un pedido viejo sin terminar sigue
+    # activo): se intercalan por fecha, leyendo las dos secuencias a la par.
+    desde = _parse_fecha(request.GET.get('desde'))
+    hasta = _parse_fecha(request.GET.get('hasta'))
+    estado = request.GET.get('estado', '')
+    ordenes = merge(
+        _ordenes_exportacion(OrdenArchivada, DetalleOrdenArchivado, desde, hasta, estado),
+        _ordenes_exportacion(Orden, DetalleOrden, desde, hasta, estado),
+        key=lambda par: par[0].fecha_orden,
+    )
+
+    response = StreamingHttpResponse(
+        _filas_exportacion_pedidos(ordenes),
+        content_type='text/csv; charset=utf-8',
+    )
+    nombre = f"pedidos_{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
 @admin_required
 def cambiar_estado_pedido(request, pedido_id):
     orden = get_object_or_404(Orden, id=pedido_id)
@@ -308,8 +612,111 @@ def cambiar_estado_pedido(request, pedido_id):
     if request.method == 'POST':
         nuevo_estado = request.POST.get('estado')
         if nuevo_estado in dict(Orden.ESTADO_CHOICES):
-            orden.estado = nuevo_estado
-            orden.save()
+            with transaction.atomic():
+                orden.estado = nuevo_estado
+                orden.save()
+                notificaciones.publicar([orden])
             messages.success(request, f'Estado del pedido #{orden.id} actualizado a {orden.get_estado_display()}.')
     
     return redirect('admin_pedidos')
+
+@admin_required
+def cambiar_estado_pedidos(request):
+    # Cambio en lote desde admin_pedidos: un UPDATE y un solo INSERT de eventos
+    if request.method == 'POST':
+        nuevo_estado = request.POST.get('estado')
+        ids = [int(pedido_id) for pedido_id in request.POST.getlist('pedidos') if pedido_id.isdigit()]
+        if nuevo_estado in dict(Orden.ESTADO_CHOICES) and ids:
+            with transaction.atomic():
+                ordenes = list(Orden.objects.filter(id__in=ids).exclude(estado=nuevo_estado).only('id', 'cliente_id'))
+                Orden.objects.filter(id__in=[orden.id for orden in ordenes]).update(estado=nuevo_estado)
+                for orden in ordenes:
+                    orden.estado = nuevo_estado
+                notificaciones.publicar(ordenes)
+            messages.success(request, f'{len(ordenes)} pedidos pasaron a {dict(Orden.ESTADO_CHOICES)[nuevo_estado]}.')
+        else:
+            messages.error(request, 'Selecciona al menos un pedido y un estado válido.')
+
+    return redirect('admin_pedidos')
+
+async def eventos_pedidos(request):
+    """
+    Flujo SSE (text/event-stream) con los cambios de estado de los pedidos
+    del usuario, para que mis_pedidos y detalle_pedido se actualicen sin
+    recargar. Con ASGI la conexión queda abierta y recibe los lotes del
+    difusor del proceso (app_logos/notificaciones.py). Con WSGI cada
+    conexión ocuparía un worker: se responde con lo pendiente y el
+    navegador vuelve a preguntar pasados NOTIFICACIONES_REINTENTO_MS.
+    """
+    # login_required todavía no admite vistas async
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return HttpResponseForbidden()
+    ultimo = request.headers.get('Last-Event-ID', '')
+    desde = await notificaciones.punto_de_partida(int(ultimo) if ultimo.isdigit() else None)
+
+    if isinstance(request, ASGIRequest):
+        contenido = notificaciones.flujo(usuario.pk, desde)
+    else:
+        eventos = await notificaciones.pendientes(usuario.pk, desde)
+        contenido = [notificaciones.encabezado(desde)] + ([notificaciones.mensaje(eventos)] if eventos else [])
+    response = StreamingHttpResponse(contenido, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx no debe juntar los eventos en su búfer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# ========== PERFILES DE RENDIMIENTO (SOLO ADMINS) ==========
+
+ORDEN_CONSULTAS = {
+    'total': 'total_ms',
+    'maximo': 'max_ms',
+    'veces': 'veces',
+    'promedio': 'promedio',
+    'ultima': 'ultima_vez',
+}
+
+@admin_required
+def consultas_lentas(request):
+    if request.method == 'POST':
+        ConsultaLenta.objects.all().delete()
+        messages.success(request, 'Se vació el registro de consultas lentas.')
+        return redirect('consultas_lentas')
+
+    orden = request.GET.get('orden', 'total')
+    if orden not in ORDEN_CONSULTAS:
+        orden = 'total'
+    # Las peores primero: la que más tiempo suma es la que más conviene arreglar
+    consultas = ConsultaLenta.objects.annotate(promedio=F('total_ms') / F('veces')).order_by(F(ORDEN_CONSULTAS[orden]).desc(), 'id')
+    paginator = Paginator(consultas, 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'app_logos/rendimiento/consultas_lentas.html', {
+        'consultas': page_obj,
+        'page_obj': page_obj,
+        'orden': orden,
+        'umbral_ms': settings.CONSULTAS_LENTAS_MS,
+        'titulo': 'Consultas Lentas',
+    })
+
+@admin_required
+def descargar_perfil(request, perfil_id):
+    # Perfil de cProfile guardado por ServerTimingMiddleware (?perfilar=1)
+    try:
+        archivo = open(ruta_perfil(perfil_id), 'rb')
+    except FileNotFoundError:
+        raise Http404('El perfil no existe o ya se borró.')
+    return FileResponse(archivo, as_attachment=True, filename=f'perfil_{perfil_id}.prof')
+
+# ========== MÉTRICAS PARA PROMETHEUS ==========
+
+@never_cache
+def metricas(request):
+    # Con METRICAS_TOKEN el scraper se identifica con "Authorization: Bearer <token>";
+    # sin él, solo los administradores pueden ver las métricas.
+    if settings.METRICAS_TOKEN:
+        autorizado = constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICAS_TOKEN}')
+    else:
+        autorizado = es_administrador(request.user)
+    if not autorizado:
+        return HttpResponseForbidden()
+    return HttpResponse(metricas_tienda.exportar(), content_type=metricas_tienda.CONTENT_TYPE_LATEST)
@@ -37,20 +37,33 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que su medición incluya a todos los demás
+    'app_logos.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Comprime (Brotli o gzip) después de que el resto haya terminado con la respuesta
+    'app_logos.middleware.CompresionMiddleware',
+    # Antes de SessionMiddleware, para que guardar la sesión también cuente como escritura
+    'app_logos.routers.PrimarioStickyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Páginas generadas en el despliegue. Después de los demás, para que sus respuestas lleven
+    # sus cabeceras (X-Frame-Options incluida); sesión y usuario son perezosos y no se cargan
+    # para servirlas.
+    'app_logos.middleware.PaginasPrerenderizadasMiddleware',
+    # Último: la respuesta de la vista pasa primero por aquí y el tiempo deja de contar como 'view'
+    'app_logos.middleware.FinVistaMiddleware',
 ]
 
 ROOT_URLCONF = 'backend_logos.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que reporta sus tiempos a ServerTimingMiddleware
+        'BACKEND': 'app_logos.backends.plantillas.DjangoTemplatesMedidas',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -60,20 +73,41 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'app_logos.context_processors.carrito_context', # Procesador de contexto personalizado
+                'app_logos.context_processors.catalogo_context',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'backend_logos.wsgi.application'
+# Con ASGI (gunicorn con `-k uvicorn.workers.UvicornWorker`) solo eventos_pedidos corre en el
+# bucle de eventos; las demás vistas son síncronas y Django las ejecuta en un hilo.
+ASGI_APPLICATION = 'backend_logos.asgi.application'
 
+# SQLite con WAL, PRAGMA de rendimiento y escrituras serializadas (app_logos/backends/sqlite3).
+# Las conexiones se reutilizan entre peticiones en lugar de abrir el archivo cada vez.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'app_logos.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# --- RÉPLICAS DE LECTURA ---
+# DB_REPLICAS: rutas (separadas por comas) de copias del primario, que se actualizan con
+# `manage.py sincronizar_replicas`. Las lecturas del catálogo se reparten entre ellas
+# (app_logos/routers.py); sin réplicas todo va al primario.
+DATABASE_REPLICAS = []
+for numero, ruta in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{numero}'
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': ruta.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['app_logos.routers.ReplicaRouter']
+# Segundos que las lecturas de quien acaba de escribir se quedan en el primario
+REPLICA_PRIMARIO_SEGUNDOS = int(os.environ.get('REPLICA_PRIMARIO_SEGUNDOS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,14 +134,127 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') # Añadido para producción
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Portadas sin variantes: se generan en un hilo de fondo (app_logos/miniaturas.py) y mientras
+# tanto se muestra el original. Desactivado, las genera `manage.py generar_miniaturas`.
+MINIATURAS_EN_SEGUNDO_PLANO = os.environ.get('MINIATURAS_EN_SEGUNDO_PLANO', 'True') == 'True'
+
+# Los archivos subidos se nombran por el hash de su contenido (ver app_logos/storage.py):
+# se deduplican solos y sus URLs pueden cachearse como inmutables.
+# En producción los estáticos se sirven con nombre hasheado, minificados y precomprimidos
+# (.gz/.br) tras `collectstatic`; en desarrollo se usan los archivos tal cual.
+STORAGES = {
+    'default': {'BACKEND': 'app_logos.storage.AlmacenamientoPorContenido'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'app_logos.storage.EstaticosComprimidos',
+    },
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# --- CACHÉ ---
+# Las claves que dependen del catálogo incluyen su versión (app_logos/catalogo.py), así que
+# las entradas viejas no se borran: caducan o se descartan al llenarse la caché.
+# Con varios procesos conviene una caché compartida (Redis, Memcached) en CACHE_BACKEND.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'logos'),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # El límite por defecto (300 entradas) no alcanza para una tarjeta por libro
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 20000}
+# Segundos que se guardan los fragmentos de plantilla (navbar, footer, tarjetas de libros)
+CACHE_FRAGMENTOS_SEGUNDOS = int(os.environ.get('CACHE_FRAGMENTOS_SEGUNDOS', 3600))
+# Segundos que se guardan las páginas completas para visitantes anónimos (app_logos/cache_paginas.py)
+CACHE_PAGINAS_SEGUNDOS = int(os.environ.get('CACHE_PAGINAS_SEGUNDOS', 600))
+# Identificador del despliegue (p. ej. el commit) que forma parte de los ETag de las páginas
+VERSION_SITIO = os.environ.get('VERSION_SITIO', '')
+
+# --- PÁGINAS PRERENDERIZADAS ---
+# `manage.py prerenderizar_paginas` las genera en cada despliegue (después de collectstatic)
+PAGINAS_PRERENDERIZADAS = ['sobre_nosotros', 'contacto']
+PAGINAS_PRERENDERIZADAS_DIR = os.path.join(BASE_DIR, 'prerender')
+
+# --- COMPRESIÓN ---
+# Respuestas más chicas no se comprimen: el ahorro no compensa el trabajo
+COMPRESION_MINIMO_BYTES = int(os.environ.get('COMPRESION_MINIMO_BYTES', 1024))
+
+# --- AVISOS DE PEDIDOS (SSE) ---
+# Cada proceso lee EventoPedido una vez cada NOTIFICACIONES_INTERVALO segundos para todas
+# sus conexiones abiertas (solo con ASGI). Con WSGI el navegador vuelve a preguntar cada
+# NOTIFICACIONES_REINTENTO_MS.
+NOTIFICACIONES_INTERVALO = float(os.environ.get('NOTIFICACIONES_INTERVALO', 1))
+NOTIFICACIONES_REINTENTO_MS = int(os.environ.get('NOTIFICACIONES_REINTENTO_MS', 15000))
+NOTIFICACIONES_LATIDO_SEGUNDOS = 15
+# Lo que un navegador desconectado puede recuperar al volver
+NOTIFICACIONES_RETENCION_SEGUNDOS = 3600
+
+# --- MEDICIÓN DE RENDIMIENTO ---
+# ServerTimingMiddleware: parámetro con el que un administrador pide el perfil de una petición
+PERFIL_PARAMETRO = 'perfilar'
+PERFILES_DIR = os.path.join(BASE_DIR, 'perfiles')
+# Perfiles que se conservan; al guardar uno nuevo se borran los más viejos
+PERFILES_MAXIMO = int(os.environ.get('PERFILES_MAXIMO', 50))
+
+# /metrics: token que debe enviar Prometheus (Authorization: Bearer ...). Sin token,
+# solo los administradores ven las métricas. Con varios procesos, definir también
+# PROMETHEUS_MULTIPROC_DIR (ver app_logos/metricas.py).
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+# Consultas a partir de estos milisegundos se registran con su plan (app_logos/consultas_lentas.py)
+# y se agrupan en la página de administración "Consultas lentas"
+CONSULTAS_LENTAS_MS = float(os.environ.get('CONSULTAS_LENTAS_MS', 100))
+
+# Una línea JSON por petición en app_logos.rendimiento (nivel con LOG_RENDIMIENTO; WARNING la apaga).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensaje': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'rendimiento': {'class': 'logging.StreamHandler', 'formatter': 'mensaje'},
+    },
+    'loggers': {
+        'app_logos.rendimiento': {
+            'handlers': ['rendimiento'],
+            'level': os.environ.get('LOG_RENDIMIENTO', 'INFO'),
+            'propagate': False,
+        },
+        'app_logos.consultas_lentas': {
+            'handlers': ['rendimiento'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # --- MEJORAS DE AUTENTICACIÓN ---
+# Sesiones en caché con respaldo en la base de datos: las lecturas no tocan django_session
+# y una caché vaciada no cierra ninguna sesión. app_logos.sesiones es cached_db con sus
+# aciertos y fallos en la métrica logos_cache.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'app_logos.sesiones')
+# Carga usuario y perfil en una sola consulta y los guarda en caché (app_logos/autenticacion.py).
+# ModelBackend sigue en la lista porque las sesiones guardan la ruta del backend con el que se
+# entró: sin él, las abiertas antes del cambio quedarían cerradas (esas siguen sin caché hasta
+# volver a entrar). Mientras esté, una contraseña incorrecta se comprueba dos veces; se puede
+# quitar cuando hayan vencido todas (SESSION_COOKIE_AGE después del despliegue).
+AUTHENTICATION_BACKENDS = [
+    'app_logos.autenticacion.UsuarioEnCacheBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USUARIO_CACHE_SEGUNDOS = int(os.environ.get('USUARIO_CACHE_SEGUNDOS', 300))
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'inicio'
 LOGOUT_REDIRECT_URL = 'inicio'
 
+# --- ARCHIVO DE PEDIDOS ---
+# Antigüedad (en días) a partir de la cual `manage.py archivar_pedidos` mueve las
+# órdenes entregadas o canceladas a las tablas de archivo.
+PEDIDOS_ARCHIVO_DIAS = int(os.environ.get('PEDIDOS_ARCHIVO_DIAS', 365))
+
 # --- MEJORAS DE SEGURIDAD EN PRODUCCIÓN (cuando DEBUG=False) ---
 # Descomentar estas líneas en un entorno de producción real.
 # SECURE_SSL_REDIRECT = True
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
@@ -8,8 +8,6 @@ from django.views.generic.base import RedirectView
 from app_logos import views as app_views
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-
     # --- RUTAS DE AUTENTICACIÓN CENTRALIZADAS ---
     # Se mueven aquí para asegurar que tengan la máxima prioridad y no sean ignoradas.
     path('login/', app_views.login_view, name='login'),
@@ -20,8 +18,14 @@ urlpatterns = [
 
     # Incluir el resto de las URLs de la aplicación
     path('', include('app_logos.urls')),
+
+    # El admin de Django va al final: su vista catch-all respondería 404 a las
+    # rutas propias de la app bajo /admin/ (productos, pedidos, usuarios).
+    path('admin/', admin.site.urls),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), app_views.servir_media),
+    ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)